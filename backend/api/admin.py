@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Station, Livreur, Zone, Bouteille, Commande, Paiement
+from .models import User, Station, Livreur, Zone, Bouteille, Commande, Tournee, Paiement, Evaluation
+from . import approvals
 
 
 @admin.register(User)
@@ -21,21 +22,11 @@ class UserAdmin(BaseUserAdmin):
     actions = ['approve_users', 'reject_users']
     
     def approve_users(self, request, queryset):
-        queryset.update(is_approved=True)
-        for user in queryset:
-            if user.role == 'station':
-                Station.objects.filter(user=user).update(is_approved=True, is_active=True)
-            if user.role == 'livreur':
-                Livreur.objects.filter(user=user).update(is_approved=True)
+        approvals.set_users_approval(queryset, True)
     approve_users.short_description = "Approuver les utilisateurs sélectionnés"
     
     def reject_users(self, request, queryset):
-        queryset.update(is_approved=False)
-        for user in queryset:
-            if user.role == 'station':
-                Station.objects.filter(user=user).update(is_approved=False, is_active=False)
-            if user.role == 'livreur':
-                Livreur.objects.filter(user=user).update(is_approved=False)
+        approvals.set_users_approval(queryset, False)
     reject_users.short_description = "Refuser les utilisateurs sélectionnés"
 
 
@@ -47,45 +38,34 @@ class StationAdmin(admin.ModelAdmin):
     actions = ['approve_stations', 'reject_stations']
     
     def approve_stations(self, request, queryset):
-        queryset.update(is_approved=True, is_active=True)
-        for station in queryset:
-            station.user.is_approved = True
-            station.user.save()
+        approvals.set_stations_approval(queryset, True)
     approve_stations.short_description = "Approuver les stations sélectionnées"
     
     def reject_stations(self, request, queryset):
-        queryset.update(is_approved=False, is_active=False)
-        for station in queryset:
-            station.user.is_approved = False
-            station.user.save()
+        approvals.set_stations_approval(queryset, False)
     reject_stations.short_description = "Refuser les stations sélectionnées"
 
 
 @admin.register(Livreur)
 class LivreurAdmin(admin.ModelAdmin):
-    list_display = ['__str__', 'vehicule', 'is_approved', 'is_disponible', 'note_moyenne', 'nombre_livraisons']
+    list_display = ['__str__', 'vehicule', 'capacite', 'is_approved', 'is_disponible', 'note_moyenne', 'nombre_livraisons']
     list_filter = ['is_approved', 'is_disponible']
     search_fields = ['user__nom', 'user__prenom', 'vehicule', 'immatriculation']
+    list_select_related = ['user']
     actions = ['approve_livreurs', 'reject_livreurs']
     
     def approve_livreurs(self, request, queryset):
-        queryset.update(is_approved=True)
-        for livreur in queryset:
-            livreur.user.is_approved = True
-            livreur.user.save()
+        approvals.set_livreurs_approval(queryset, True)
     approve_livreurs.short_description = "Approuver les livreurs sélectionnés"
     
     def reject_livreurs(self, request, queryset):
-        queryset.update(is_approved=False)
-        for livreur in queryset:
-            livreur.user.is_approved = False
-            livreur.user.save()
+        approvals.set_livreurs_approval(queryset, False)
     reject_livreurs.short_description = "Refuser les livreurs sélectionnés"
 
 
 @admin.register(Zone)
 class ZoneAdmin(admin.ModelAdmin):
-    list_display = ['nom', 'frais_livraison', 'delai_estime', 'is_active']
+    list_display = ['nom', 'frais_livraison', 'delai_estime', 'rayon_km', 'is_active']
     list_filter = ['is_active']
     search_fields = ['nom']
 
@@ -95,6 +75,7 @@ class BouteilleAdmin(admin.ModelAdmin):
     list_display = ['nom_commercial', 'type', 'marque', 'prix', 'stock', 'station', 'disponible']
     list_filter = ['type', 'marque', 'disponible']
     search_fields = ['nom_commercial', 'marque', 'code_produit']
+    list_select_related = ['station']
 
 
 @admin.register(Commande)
@@ -102,11 +83,28 @@ class CommandeAdmin(admin.ModelAdmin):
     list_display = ['id', 'client', 'station', 'statut', 'montant_total', 'date_commande']
     list_filter = ['statut', 'date_commande']
     search_fields = ['client__email', 'adresse_livraison']
+    list_select_related = ['client', 'station']
     date_hierarchy = 'date_commande'
 
 
+@admin.register(Tournee)
+class TourneeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'livreur', 'station', 'distance_km', 'date_creation']
+    list_select_related = ['livreur__user', 'station']
+    raw_id_fields = ['livreur', 'station']
+
+
 @admin.register(Paiement)
 class PaiementAdmin(admin.ModelAdmin):
     list_display = ['reference', 'commande', 'montant', 'methode', 'statut', 'date_paiement']
     list_filter = ['methode', 'statut']
     search_fields = ['reference']
+    list_select_related = ['commande__client']
+
+
+@admin.register(Evaluation)
+class EvaluationAdmin(admin.ModelAdmin):
+    list_display = ['commande', 'livreur', 'note', 'date_creation']
+    list_filter = ['note']
+    list_select_related = ['commande__client', 'livreur__user']
+    raw_id_fields = ['commande', 'livreur']
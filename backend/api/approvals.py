@@ -0,0 +1,45 @@
+from django.db import transaction
+
+from . import authentication, catalogue
+from .models import User, Station, Livreur
+
+
+def station_flags(approved):
+    return {'is_approved': approved, 'is_active': approved}
+
+
+def after_update():
+    # queryset.update() n'émet pas de signaux : invalidations faites ici
+    transaction.on_commit(catalogue.invalidate)
+    transaction.on_commit(authentication.invalidate_all)
+
+
+def set_users_approval(users, approved):
+    """
+    Approuve ou refuse les utilisateurs de `users` et leurs profils station /
+    livreur en trois UPDATE ... WHERE ... IN (sous-requête), quel que soit le
+    nombre de lignes. Les profils sont mis à jour avant les utilisateurs : la
+    sous-requête peut filtrer sur is_approved (approbations en attente).
+    """
+    with transaction.atomic():
+        Station.objects.filter(user__in=users.filter(role='station').values('pk')).update(**station_flags(approved))
+        Livreur.objects.filter(user__in=users.filter(role='livreur').values('pk')).update(is_approved=approved)
+        count = User.objects.filter(pk__in=users.values('pk')).update(is_approved=approved)
+        after_update()
+    return count
+
+
+def set_stations_approval(stations, approved):
+    with transaction.atomic():
+        User.objects.filter(pk__in=stations.values('user_id')).update(is_approved=approved)
+        count = Station.objects.filter(pk__in=stations.values('pk')).update(**station_flags(approved))
+        after_update()
+    return count
+
+
+def set_livreurs_approval(livreurs, approved):
+    with transaction.atomic():
+        User.objects.filter(pk__in=livreurs.values('user_id')).update(is_approved=approved)
+        count = Livreur.objects.filter(pk__in=livreurs.values('pk')).update(is_approved=approved)
+        after_update()
+    return count
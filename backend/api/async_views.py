@@ -0,0 +1,137 @@
+"""
+Versions asynchrones des endpoints de lecture les plus sollicités, servies
+sous /api/async/ par l'application ASGI (gazexpress.asgi, ex.
+`uvicorn gazexpress.asgi:application`). Elles reprennent querysets,
+permissions, pagination et serializers des vues DRF synchrones ; seules
+l'authentification et l'évaluation des requêtes passent par l'ORM
+asynchrone, de sorte qu'une requête en attente de la base ne bloque pas de
+worker. Sous WSGI, ces vues fonctionnent mais sans ce bénéfice.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import catalogue, db_router
+from .authentication import CachedJWTAuthentication
+from .serializers import DashboardStatsSerializer
+from .stats import adashboard_stats
+from .views import BouteilleViewSet, StationViewSet, CommandeViewSet, DashboardStatsView
+
+
+class AsyncReadView(View):
+    """
+    Vue Django asynchrone adossée à une vue DRF (`view_class`) : l'instance DRF
+    fournit get_queryset, les permissions et les serializers, appelés sans
+    accès à la base. Les lectures vont au réplica comme avec ReplicaReadMixin.
+    """
+    view_class = None
+    action = 'list'
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, pk=None):
+        backend = CachedJWTAuthentication()
+        drf_request = Request(request, authenticators=[backend])
+        view = self.view_class(request=drf_request, args=(), kwargs={'pk': pk} if pk else {},
+                               format_kwarg=None, headers={})
+        view.action = self.action
+        try:
+            await self.authenticate(backend, drf_request)
+            view.check_permissions(drf_request)
+            token = db_router.start_replica_reads()
+            try:
+                data, code, headers = await self.respond(view, drf_request, pk)
+            finally:
+                db_router.stop_replica_reads(token)
+        except (exceptions.APIException, Http404) as exc:
+            response = view.handle_exception(exc)
+            data, code, headers = response.data, response.status_code, dict(response.items())
+        return self.render(data, code, headers)
+
+    async def authenticate(self, backend, request):
+        result = await backend.aauthenticate(request._request)
+        # Résultat posé directement sur la Request DRF : request.user ne relance
+        # pas l'authentification synchrone
+        request._authenticator = backend if result is not None else None
+        request.user, request.auth = result if result is not None else (AnonymousUser(), None)
+
+    async def respond(self, view, request, pk):
+        return await self.read(view, request, pk), status.HTTP_200_OK, {}
+
+    async def read(self, view, request, pk):
+        raise NotImplementedError
+
+    def render(self, data, code, headers):
+        response = HttpResponse(JSONRenderer().render(data), status=code, content_type='application/json')
+        for key, value in headers.items():
+            if key.lower() != 'content-type':
+                response[key] = value
+        return response
+
+
+class AsyncListView(AsyncReadView):
+    async def read(self, view, request, pk):
+        queryset = view.get_queryset()
+        if request.query_params.get('near'):
+            # Classement par distance en Python (api.geo.filter_near) : évaluation synchrone
+            page = view.paginate_queryset(await sync_to_async(view.filter_queryset)(queryset))
+        else:
+            page = await view.paginator.apaginate_queryset(view.filter_queryset(queryset), request, view)
+        return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+
+class AsyncDetailView(AsyncReadView):
+    action = 'retrieve'
+
+    async def read(self, view, request, pk):
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            obj = await queryset.aget(pk=pk)
+        except (ObjectDoesNotExist, ValueError, DjangoValidationError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        view.check_object_permissions(request, obj)
+        return view.get_serializer(obj).data
+
+
+class BouteilleListView(AsyncListView):
+    view_class = BouteilleViewSet
+
+    async def respond(self, view, request, pk):
+        # Même cache versionné et ETag que CatalogueCacheMixin
+        if not view.catalogue_cacheable(request):
+            return await super().respond(view, request, pk)
+        key = catalogue.cache_key(request, view.action, await catalogue.aversion())
+        entry = await cache.aget(key)
+        if entry is None:
+            data = await self.read(view, request, pk)
+            entry = {'data': data, 'etag': catalogue.compute_etag(data)}
+            await cache.aset(key, entry, getattr(settings, 'CATALOGUE_CACHE_TTL', 60))
+        headers = {'ETag': entry['etag'], 'Vary': 'Accept, Authorization'}
+        if catalogue.not_modified(request, entry['etag']):
+            return None, status.HTTP_304_NOT_MODIFIED, headers
+        return entry['data'], status.HTTP_200_OK, headers
+
+
+class StationListView(AsyncListView):
+    view_class = StationViewSet
+
+
+class CommandeListView(AsyncListView):
+    view_class = CommandeViewSet
+
+
+class CommandeDetailView(AsyncDetailView):
+    view_class = CommandeViewSet
+
+
+class DashboardView(AsyncReadView):
+    view_class = DashboardStatsView
+
+    async def read(self, view, request, pk):
+        return DashboardStatsSerializer(await adashboard_stats()).data
@@ -0,0 +1,157 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+USER_CACHE_KEY = 'auth:user:{}'
+USER_VERSION_KEY = 'auth:user-version:{}'
+GLOBAL_VERSION_KEY = 'auth:user-version:all'
+
+
+def user_queryset():
+    # Utilisateur et profil de rôle en une seule jointure
+    return User.objects.select_related('station_profile', 'livreur_profile')
+
+
+def load_user(user_id):
+    return user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+
+
+async def aload_user(user_id):
+    return await user_queryset().aget(**{api_settings.USER_ID_FIELD: user_id})
+
+
+def new_version():
+    # Jeton unique plutôt qu'un compteur (cf. zones.new_version) : une clé
+    # évincée puis recréée ne reprend pas une version portée par une entrée périmée
+    return time.time_ns()
+
+
+def bump(key):
+    cache.set(key, new_version(), None)
+
+
+def invalidate(user_id):
+    """Invalide les utilisateurs mis en cache pour tous les jetons de `user_id`."""
+    bump(USER_VERSION_KEY.format(user_id))
+
+
+def invalidate_all():
+    """Invalide tout le cache d'authentification (mises à jour en masse, api.approvals)."""
+    bump(GLOBAL_VERSION_KEY)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication dont l'utilisateur (avec station_profile /
+    livreur_profile déjà chargés) est gardé en cache quelques secondes sous le
+    `jti` du jeton : une rafale de requêtes d'un même client ne coûte qu'une
+    requête SQL. Chaque entrée porte la version de l'utilisateur, remplacée par
+    un nouveau jeton après chaque modification de User, Station ou Livreur (api.signals), ainsi
+    qu'une version globale pour les mises à jour en masse. Le cache doit être
+    partagé entre processus (contrôle api.E001) pour que l'invalidation les
+    atteigne tous.
+
+    request.user est un instantané en lecture seule, sans le hachage du mot
+    de passe : les vues qui modifient l'utilisateur le relisent (load_user).
+    """
+
+    def get_user(self, validated_token):
+        user_id, keys = self.cache_keys(validated_token)
+        cached = cache.get_many(keys) if keys else {}
+        entry = self.cached_entry(cached, keys)
+        if entry is None:
+            try:
+                user = load_user(user_id)
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            missing = self.missing_versions(cached, keys)
+            if missing:
+                for key in missing:
+                    cache.add(key, new_version(), None)
+                cached.update(cache.get_many(missing))
+            entry = self.make_entry(cached, keys, user)
+            if keys:
+                cache.set(keys[0], entry, getattr(settings, 'AUTH_USER_CACHE_TTL', 30))
+        return self.check_user(entry, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() pour les vues asynchrones (api.async_views) ; request est une HttpRequest."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id, keys = self.cache_keys(validated_token)
+        cached = await cache.aget_many(keys) if keys else {}
+        entry = self.cached_entry(cached, keys)
+        if entry is None:
+            try:
+                user = await aload_user(user_id)
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            missing = self.missing_versions(cached, keys)
+            if missing:
+                for key in missing:
+                    await cache.aadd(key, new_version(), None)
+                cached.update(await cache.aget_many(missing))
+            entry = self.make_entry(cached, keys, user)
+            if keys:
+                await cache.aset(keys[0], entry, getattr(settings, 'AUTH_USER_CACHE_TTL', 30))
+        return self.check_user(entry, validated_token)
+
+    def cache_keys(self, validated_token):
+        # (clé de l'entrée, version de l'utilisateur, version globale) ; pas de cache sans jti
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is None:
+            return user_id, []
+        return user_id, [USER_CACHE_KEY.format(jti), USER_VERSION_KEY.format(user_id), GLOBAL_VERSION_KEY]
+
+    def version(self, cached, keys):
+        return (cached.get(keys[1]), cached.get(keys[2])) if keys else None
+
+    def missing_versions(self, cached, keys):
+        # Version jamais créée ou évincée : créée avec un nouveau jeton avant de mettre l'utilisateur en cache
+        return [key for key in keys[1:] if key not in cached]
+
+    def make_entry(self, cached, keys, user):
+        # Seule l'empreinte du mot de passe (révocation des jetons) est conservée
+        password_hash = get_md5_hash_password(user.password)
+        user.password = None
+        return (self.version(cached, keys), user, password_hash)
+
+    def cached_entry(self, cached, keys):
+        entry = cached.get(keys[0]) if keys else None
+        # Sans l'une des versions (évincée), aucune entrée n'est sûre
+        version = self.version(cached, keys)
+        if entry is not None and None not in version and entry[0] == version:
+            return entry
+        return None
+
+    def check_user(self, entry, validated_token):
+        _, user, password_hash = entry
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,11 @@
+"""
+Outils de mesure des performances de l'API (manage.py bench) : génération
+d'un jeu de données volumineux (seed), harnais de mesure commun (harness),
+endpoints mesurés (endpoints), comparaison avec/sans index (indexes) et
+WSGI/ASGI sous charge (servers).
+"""
+from .endpoints import list_endpoints, router_endpoints, run, run_all, write_endpoints
+from .harness import BenchmarkError, compare, measure, percentile
+from .indexes import api_indexes, check_can_drop_indexes, index_names, is_test_database, without_indexes
+from .seed import seed
+from .servers import ASYNC_ENDPOINTS, run_async_comparison
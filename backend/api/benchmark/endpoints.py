@@ -0,0 +1,179 @@
+from django.contrib.auth.hashers import make_password
+from django.db.models import Count
+
+from ..models import User, Station, Livreur, Bouteille, Commande
+from .harness import client_for, measure, report_meta
+
+
+def busiest(model, field):
+    """Objet ayant le plus de commandes pour `field` (client, station, livreur)."""
+    pk = (
+        Commande.objects.order_by().exclude(**{f'{field}__isnull': True})
+        .values(field).annotate(n=Count('id')).order_by('-n')
+        .values_list(field, flat=True).first()
+    )
+    return model.objects.filter(pk=pk).first() if pk is not None else None
+
+
+def bench_admin():
+    return User.objects.filter(role='admin').first() or User.objects.create(
+        email='bench-admin@gazexpress.cm', username='bench-admin@gazexpress.cm',
+        nom='Bench', prenom='Admin', telephone='690000000', role='admin', password=make_password(None),
+    )
+
+
+def list_endpoints():
+    """Endpoints de liste avec l'utilisateur représentatif de chaque chemin de filtrage."""
+    admin = bench_admin()
+    client = busiest(User, 'client')
+    station = busiest(Station, 'station')
+    livreur = busiest(Livreur, 'livreur')
+    endpoints = [
+        ('commandes (admin)', admin, '/api/commandes/'),
+        ('bouteilles (anonyme)', None, '/api/bouteilles/'),
+        ('bouteilles ?type=', None, '/api/bouteilles/?type=12kg'),
+        ('stations', admin, '/api/stations/'),
+        ('approbations en attente', admin, '/api/admin/pending-approvals/'),
+        ('paiements', admin, '/api/paiements/'),
+        ('dashboard', admin, '/api/admin/dashboard/'),
+    ]
+    if client:
+        endpoints.append(('commandes (client)', client, '/api/commandes/'))
+    if station:
+        endpoints.append(('commandes (station)', station.user, '/api/commandes/'))
+    if livreur:
+        endpoints.append(('commandes (livreur)', livreur.user, '/api/commandes/'))
+        endpoints.append(('livreurs disponibles', livreur.user, '/api/livreurs/disponibles/'))
+    return endpoints
+
+
+# Actions réservées à un rôle : mesurées avec l'utilisateur le plus actif de ce rôle
+ACTION_ROLES = {'disponibles': 'livreur', 'tournee': 'livreur', 'position': 'livreur', 'inbox': 'station'}
+OTHER_ENDPOINTS = [
+    ('auth/profile', 'client', '/api/auth/profile/'),
+    ('admin/pending-approvals', 'admin', '/api/admin/pending-approvals/'),
+    ('admin/dashboard', 'admin', '/api/admin/dashboard/'),
+    ('admin/metrics', 'admin', '/api/admin/metrics/'),
+    ('health', None, '/api/health/'),
+]
+
+
+def bench_users():
+    station = busiest(Station, 'station')
+    livreur = busiest(Livreur, 'livreur')
+    return {
+        'admin': bench_admin(),
+        'client': busiest(User, 'client'),
+        'station': station.user if station else None,
+        'livreur': livreur.user if livreur else None,
+    }
+
+
+def detail_pk(model, user):
+    # L'objet de l'utilisateur lui-même quand il en a un (son profil livreur ou station)
+    for profile in ('station_profile', 'livreur_profile'):
+        obj = getattr(user, profile, None)
+        if isinstance(obj, model):
+            return obj.pk
+    return model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def router_endpoints(users):
+    """Chaque route GET du routeur (api.urls) : liste, détail et actions, puis les vues hors routeur."""
+    from ..urls import router
+
+    endpoints = []
+    for prefix, viewset, _ in router.registry:
+        model = viewset.queryset.model
+        base = f'/api/{prefix}/'
+        endpoints.append((f'{prefix} list', users['admin'], base))
+        pk = detail_pk(model, users['admin'])
+        if pk is not None:
+            endpoints.append((f'{prefix} detail', users['admin'], f'{base}{pk}/'))
+        for extra in viewset.get_extra_actions():
+            if 'get' not in extra.mapping:
+                continue
+            user = users.get(ACTION_ROLES.get(extra.url_path, 'admin'))
+            if user is None:
+                continue
+            if extra.detail:
+                pk = detail_pk(model, user)
+                if pk is None:
+                    continue
+                endpoints.append((f'{prefix} {extra.url_path}', user, f'{base}{pk}/{extra.url_path}/'))
+            else:
+                endpoints.append((f'{prefix} {extra.url_path}', user, f'{base}{extra.url_path}/'))
+    for name, role, url in OTHER_ENDPOINTS:
+        if role is None or users.get(role) is not None:
+            endpoints.append((name, users.get(role), url))
+    return endpoints
+
+
+def run(iterations=50):
+    return [
+        {'name': name, **measure(client_for(user), url, iterations)}
+        for name, user, url in list_endpoints()
+    ]
+
+
+# Taille des lots mesurés par /bulk/ et /bulk_update_status/
+BULK_SIZE = 10
+# Statuts alternés par les écritures mesurées : aucun effet sur le stock
+TOGGLED_STATUTS = ('en_attente', 'en_cours')
+
+
+def write_endpoints(users):
+    """
+    Écritures du parcours commande sur le jeu généré : création unitaire et en
+    lot par le client le plus actif, changements de statut (unitaire et en
+    lot) par l'admin. Le corps de chaque appel est construit par une fonction
+    du rang de l'appel, pour que chaque changement de statut soit effectif.
+    """
+    endpoints = []
+    client = users['client']
+    bouteille = Bouteille.objects.select_related('station').filter(disponible=True).order_by('-stock', 'pk').first()
+    if client is not None and bouteille is not None:
+        item = {'bouteille_id': bouteille.pk, 'quantite': 1, 'adresse_livraison': bouteille.station.adresse}
+        endpoints.append(('commandes create', client, '/api/commandes/', lambda i: item))
+        endpoints.append((
+            'commandes bulk', client, '/api/commandes/bulk/', lambda i: {'commandes': [item] * BULK_SIZE},
+        ))
+
+    def statut(i):
+        return TOGGLED_STATUTS[i % len(TOGGLED_STATUTS)]
+
+    ouvertes = list(
+        Commande.objects.filter(statut__in=TOGGLED_STATUTS).order_by('pk').values_list('pk', flat=True)[:BULK_SIZE + 1]
+    )
+    if ouvertes:
+        pk, lot = ouvertes[0], ouvertes[1:]
+        endpoints.append((
+            'commandes update_status', users['admin'], f'/api/commandes/{pk}/update_status/',
+            lambda i: {'statut': statut(i)},
+        ))
+        if lot:
+            endpoints.append((
+                'commandes bulk_update_status', users['admin'], '/api/commandes/bulk_update_status/',
+                lambda i: {'commandes': [{'id': pk, 'statut': statut(i)} for pk in lot]},
+            ))
+    return endpoints
+
+
+def run_all(iterations=50):
+    """
+    Rapport JSON comparable d'un commit à l'autre (voir manage.py bench api) :
+    chaque route GET du routeur puis les écritures du parcours commande.
+    """
+    users = bench_users()
+    endpoints = [(name, user, url, None) for name, user, url in router_endpoints(users)]
+    endpoints += write_endpoints(users)
+    return {
+        'meta': report_meta(iterations=iterations),
+        'endpoints': [
+            {
+                'name': name,
+                **measure(client_for(user), url, iterations, method='get' if data is None else 'post', data=data),
+            }
+            for name, user, url, data in endpoints
+        ],
+    }
@@ -0,0 +1,98 @@
+import statistics
+import subprocess
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Commande
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(samples, q):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1]
+
+
+def measure(client, url, iterations=50, warmup=3, method='get', data=None):
+    """
+    Latence d'un endpoint appelé `iterations` fois après `warmup` appels.
+    Pour une écriture, `data(i)` construit le corps JSON de l'appel i : chaque
+    appel part d'un état différent (ex. statut alterné) plutôt que de rejouer un no-op.
+    """
+    request = getattr(client, method)
+
+    def call(i):
+        if data is None:
+            return request(url)
+        return request(url, data(i), format='json')
+
+    for i in range(warmup):
+        call(i)
+    timings = []
+    queries = 0
+    status_code = None
+    for i in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = call(i)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(ctx.captured_queries)
+        status_code = response.status_code
+    return {
+        'url': url,
+        'method': method.upper(),
+        'status': status_code,
+        'rps': round(1000 * len(timings) / sum(timings), 1),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': queries,
+    }
+
+
+def client_for(user):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_meta(**extra):
+    """En-tête commun des rapports JSON : commit, date, base et volume de commandes."""
+    return {
+        'commit': git_commit(),
+        'date': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'commandes': Commande.objects.count(),
+        **extra,
+    }
+
+
+def compare(report, baseline):
+    """Ajoute à chaque endpoint l'écart (%) de débit et de p95 par rapport à un rapport précédent."""
+    previous = {row['name']: row for row in baseline.get('endpoints', [])}
+    for row in report['endpoints']:
+        old = previous.get(row['name'])
+        if not old:
+            continue
+        for key in ('rps', 'p95_ms'):
+            if old.get(key):
+                row[f'{key}_delta_pct'] = round(100 * (row[key] - old[key]) / old[key], 1)
+    report['meta']['baseline_commit'] = baseline.get('meta', {}).get('commit')
+    return report
@@ -0,0 +1,73 @@
+import os
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import DatabaseError, connection
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+
+from .harness import BenchmarkError
+
+
+def api_indexes():
+    for model in apps.get_app_config('api').get_models():
+        for index in model._meta.indexes:
+            yield model, index
+
+
+def is_test_database():
+    name = str(connection.settings_dict['NAME'])
+    test_name = connection.settings_dict.get('TEST', {}).get('NAME')
+    return (
+        (test_name is not None and name == str(test_name))
+        or os.path.basename(name).startswith(TEST_DATABASE_PREFIX)
+        or connection.is_in_memory_db()
+    )
+
+
+def check_can_drop_indexes(allow_drop=False):
+    if not (allow_drop or is_test_database()):
+        raise BenchmarkError(
+            f"Refus de supprimer les index de {connection.settings_dict['NAME']} : "
+            "ce n'est pas une base de test (forcer avec --allow-drop)."
+        )
+
+
+def index_names(model):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {name for name, info in constraints.items() if info['index']}
+
+
+@contextmanager
+def without_indexes(allow_drop=False):
+    """
+    Supprime temporairement les index déclarés dans Meta.indexes (mesure « avant »).
+    Refusé hors base de test sans `allow_drop` ; en sortie les index sont
+    recréés puis leur présence vérifiée.
+    """
+    check_can_drop_indexes(allow_drop)
+    indexes = list(api_indexes())
+    dropped = []
+    try:
+        for model, index in indexes:
+            with connection.schema_editor() as editor:
+                editor.remove_index(model, index)
+            dropped.append((model, index))
+        yield indexes
+    finally:
+        restore_indexes(dropped)
+
+
+def restore_indexes(indexes):
+    # Index par index : un échec n'empêche pas de recréer les suivants
+    missing = []
+    for model, index in indexes:
+        try:
+            with connection.schema_editor() as editor:
+                editor.add_index(model, index)
+        except DatabaseError:
+            pass
+        if index.name not in index_names(model):
+            missing.append(f'{model._meta.db_table}.{index.name}')
+    if missing:
+        raise BenchmarkError(f"Index non recréés, à rétablir par migration : {', '.join(missing)}")
@@ -0,0 +1,180 @@
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .. import stats
+from ..geo import geo_cell
+from ..models import User, Station, Livreur, Zone, Bouteille, Commande, Paiement
+
+
+STATUTS = [code for code, _ in Commande.STATUT_CHOICES]
+STATUT_WEIGHTS = [5, 5, 5, 75, 10]
+TYPES = [('6kg', Decimal('3500')), ('12kg', Decimal('6500')), ('15kg', Decimal('8500'))]
+MARQUES = ['Tradex', 'Total', 'SCTM', 'Camgaz']
+METHODES = [code for code, _ in Paiement.METHODE_CHOICES]
+# Centre approximatif de chaque ville desservie
+VILLES = {'Douala': (4.05, 9.70), 'Yaoundé': (3.85, 11.50)}
+
+
+@contextmanager
+def manual_dates(*fields):
+    # bulk_create appelle pre_save : auto_now / auto_now_add écraseraient les dates générées
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def batches(objects, chunk_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def chunked_create(model, objects, chunk_size, stdout=None, label=None):
+    created = 0
+    for batch in batches(objects, chunk_size):
+        model.objects.bulk_create(batch)
+        created += len(batch)
+        if stdout and len(batch) == chunk_size:
+            stdout.write(f'  {label or model.__name__}: {created}')
+    return created
+
+
+def make_user(email, role, latitude=None, longitude=None, password=None):
+    return User(
+        email=email, username=email, nom='Test', prenom=role.capitalize(), telephone='690000000',
+        role=role, is_approved=True, password=password,
+        latitude=latitude, longitude=longitude, geo_cell=geo_cell(latitude, longitude),
+    )
+
+
+def ville_of(user):
+    # Ville la plus proche des coordonnées générées
+    return min(VILLES, key=lambda ville: abs(float(user.latitude) - VILLES[ville][0])
+               + abs(float(user.longitude) - VILLES[ville][1]))
+
+
+def seed(commandes=1_000_000, stations=200, clients=20_000, livreurs=2_000, days=365,
+         chunk_size=10_000, prefix='bench', paiements=True, stdout=None, rng=None):
+    """
+    Génère un jeu de données volumineux par bulk_create (sans signaux), puis
+    reconstruit les rollups. Stations et livreurs sont répartis entre Douala
+    et Yaoundé ; chaque commande est livrée près de sa station et les
+    commandes livrées ou en cours reçoivent un paiement.
+    """
+    rng = rng or random.Random(42)
+    password = make_password(None)
+    villes = list(VILLES)
+
+    def point(ville, spread=0.1):
+        latitude, longitude = VILLES[ville]
+        return (
+            Decimal(str(round(latitude + rng.uniform(-spread, spread), 6))),
+            Decimal(str(round(longitude + rng.uniform(-spread, spread), 6))),
+        )
+
+    with transaction.atomic():
+        zones = {
+            ville: Zone.objects.create(
+                nom=f'{prefix} {ville}', frais_livraison=Decimal('500'), delai_estime='45 min'
+            )
+            for ville in villes
+        }
+
+        users = [make_user(f'{prefix}-station{i}@gazexpress.cm', 'station', *point(villes[i % len(villes)]),
+                           password=password)
+                 for i in range(stations)]
+        users += [make_user(f'{prefix}-livreur{i}@gazexpress.cm', 'livreur', *point(villes[i % len(villes)]),
+                            password=password)
+                  for i in range(livreurs)]
+        chunked_create(User, users, chunk_size)
+        chunked_create(User, (make_user(f'{prefix}-client{i}@gazexpress.cm', 'client', password=password)
+                              for i in range(clients)), chunk_size, stdout, 'clients')
+
+        station_users = list(User.objects.filter(email__startswith=f'{prefix}-station').order_by('email'))
+        livreur_users = list(User.objects.filter(email__startswith=f'{prefix}-livreur').order_by('email'))
+        Station.objects.bulk_create([
+            Station(user=user, nom=f'Station {i}', adresse=ville_of(user), telephone='690000001',
+                    latitude=user.latitude, longitude=user.longitude, geo_cell=user.geo_cell,
+                    is_active=True, is_approved=True)
+            for i, user in enumerate(station_users)
+        ], batch_size=chunk_size)
+        Livreur.objects.bulk_create([
+            Livreur(user=user, vehicule='Moto', immatriculation=f'LT-{i:05d}', zone=zones[ville_of(user)],
+                    is_approved=True, is_disponible=rng.random() < 0.6)
+            for i, user in enumerate(livreur_users)
+        ], batch_size=chunk_size)
+
+        station_list = list(Station.objects.filter(user__email__startswith=f'{prefix}-station'))
+        Bouteille.objects.bulk_create([
+            Bouteille(station=station, nom_commercial=f'{marque} {type_}', type=type_, marque=marque,
+                      prix=prix, stock=10_000, disponible=rng.random() < 0.9)
+            for station in station_list
+            for (type_, prix), marque in zip(TYPES, rng.sample(MARQUES, len(TYPES)))
+        ], batch_size=chunk_size)
+
+    station_zones = {station.pk: zones[station.adresse] for station in station_list}
+    bouteilles = list(
+        Bouteille.objects.filter(station__in=station_list)
+        .values_list('id', 'station_id', 'prix', 'station__adresse')
+    )
+    client_ids = list(User.objects.filter(email__startswith=f'{prefix}-client').values_list('id', flat=True))
+    livreur_ids = list(Livreur.objects.filter(user__email__startswith=f'{prefix}-livreur').values_list('id', flat=True))
+    now = timezone.now()
+
+    def generate():
+        for _ in range(commandes):
+            bouteille_id, station_id, prix, ville = rng.choice(bouteilles)
+            zone = station_zones[station_id]
+            quantite = rng.randint(1, 3)
+            statut = rng.choices(STATUTS, STATUT_WEIGHTS)[0]
+            date = now - timezone.timedelta(seconds=rng.randint(0, days * 86400))
+            prix_total = prix * quantite
+            latitude, longitude = point(ville, spread=0.15)
+            yield Commande(
+                client_id=rng.choice(client_ids), bouteille_id=bouteille_id, station_id=station_id,
+                livreur_id=None if statut == 'en_attente' else rng.choice(livreur_ids),
+                zone_id=zone.pk, quantite=quantite, prix_total=prix_total,
+                frais_livraison=zone.frais_livraison, montant_total=prix_total + zone.frais_livraison,
+                adresse_livraison=ville, latitude_livraison=latitude, longitude_livraison=longitude,
+                statut=statut, date_commande=date, date_modification=date,
+                date_livraison=date if statut == 'livree' else None,
+            )
+
+    def payments(batch, offset):
+        for i, commande in enumerate(batch, start=offset):
+            if commande.statut in ('livree', 'en_cours'):
+                yield Paiement(
+                    commande_id=commande.pk, montant=commande.montant_total, methode=rng.choice(METHODES),
+                    statut='confirme' if commande.statut == 'livree' else 'en_attente',
+                    reference=f'{prefix.upper()}-{i:09d}', date_paiement=commande.date_commande,
+                )
+
+    created = 0
+    dates = [Commande._meta.get_field('date_commande'), Commande._meta.get_field('date_modification'),
+             Paiement._meta.get_field('date_paiement')]
+    with manual_dates(*dates), transaction.atomic():
+        for batch in batches(generate(), chunk_size):
+            # bulk_create renseigne les clés primaires (RETURNING) : paiements du même lot
+            Commande.objects.bulk_create(batch)
+            if paiements:
+                Paiement.objects.bulk_create(payments(batch, created))
+            created += len(batch)
+            if stdout:
+                stdout.write(f'  commandes: {created}')
+    stats.rebuild()
+    return created
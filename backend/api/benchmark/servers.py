@@ -0,0 +1,194 @@
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..models import Commande
+from .endpoints import bench_users
+from .harness import percentile, report_meta
+
+
+# Endpoints servis à la fois par les vues DRF (/api/) et par api.async_views (/api/async/)
+ASYNC_ENDPOINTS = [
+    ('bouteilles', None, 'bouteilles/'),
+    ('stations', 'admin', 'stations/'),
+    ('commandes (admin)', 'admin', 'commandes/'),
+    ('commandes (client)', 'client', 'commandes/'),
+    ('commandes detail', 'admin', 'commandes/{pk}/'),
+    ('dashboard', 'admin', 'admin/dashboard/'),
+]
+
+
+def bearer(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}' if user is not None else None
+
+
+def split_path(url):
+    path, _, query = url.partition('?')
+    return path, query
+
+
+def wsgi_get(application, url, authorization):
+    path, query = split_path(url)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    if authorization:
+        environ['HTTP_AUTHORIZATION'] = authorization
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+    try:
+        for _ in body:
+            pass
+    finally:
+        # close() émet request_finished : fermeture des connexions comme sous gunicorn
+        body.close()
+    return status[0]
+
+
+async def asgi_get(application, url, authorization):
+    path, query = split_path(url)
+    headers = [(b'host', b'testserver')]
+    if authorization:
+        headers.append((b'authorization', authorization.encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    disconnected = asyncio.Event()
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Le client reste connecté jusqu'à la fin de la réponse
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+        received = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status[0]
+
+
+class DatabaseLatency:
+    """Ajoute `seconds` à chaque requête SQL : simule une base distante (aller-retour réseau)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+@contextmanager
+def database_latency(milliseconds):
+    if not milliseconds:
+        yield
+        return
+    latency = DatabaseLatency(milliseconds / 1000)
+    # Les serveurs ouvrent leurs connexions dans leurs propres threads
+    connection_created.connect(latency.install, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(latency.install)
+
+
+def load_summary(results, elapsed):
+    timings = [duration for _, duration in results]
+    return {
+        'status': max(code for code, _ in results),
+        'errors': sum(1 for code, _ in results if code >= 500),
+        'rps': round(len(results) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+    }
+
+
+def load_wsgi(application, url, authorization, requests, workers):
+    """Déploiement WSGI actuel : `workers` threads (gunicorn --threads), une requête chacun à la fois."""
+    def one(_):
+        started = time.perf_counter()
+        code = wsgi_get(application, url, authorization)
+        return code, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(one, range(requests)))
+    return load_summary(results, time.perf_counter() - started)
+
+
+async def load_asgi(application, url, authorization, requests, concurrency):
+    """Une boucle d'événements (un worker uvicorn) et `concurrency` connexions simultanées."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            code = await asgi_get(application, url, authorization)
+            return code, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    return load_summary(results, time.perf_counter() - started)
+
+
+def run_async_comparison(concurrency=50, requests=500, wsgi_workers=8, db_latency_ms=0):
+    """
+    Débit sous charge concurrente des vues DRF servies en WSGI (pool de
+    threads) face à leurs versions api.async_views servies en ASGI, en
+    processus : pas de réseau, seuls les handlers Django sont mesurés.
+    """
+    users = bench_users()
+    pk = Commande.objects.order_by('-pk').values_list('pk', flat=True).first()
+    endpoints = [
+        (name, bearer(users[role]) if role else None, path.format(pk=pk))
+        for name, role, path in ASYNC_ENDPOINTS
+        if (role is None or users.get(role) is not None) and (pk is not None or '{pk}' not in path)
+    ]
+    wsgi, asgi = WSGIHandler(), ASGIHandler()
+    rows = []
+    with database_latency(db_latency_ms):
+        for name, authorization, path in endpoints:
+            row = {
+                'name': name,
+                'wsgi': load_wsgi(wsgi, f'/api/{path}', authorization, requests, wsgi_workers),
+                'asgi': asyncio.run(load_asgi(asgi, f'/api/async/{path}', authorization, requests, concurrency)),
+            }
+            if row['wsgi']['rps']:
+                row['rps_gain_pct'] = round(100 * (row['asgi']['rps'] - row['wsgi']['rps']) / row['wsgi']['rps'], 1)
+            rows.append(row)
+    return {
+        'meta': report_meta(
+            requests=requests, concurrency=concurrency, wsgi_workers=wsgi_workers, db_latency_ms=db_latency_ms,
+        ),
+        'endpoints': rows,
+    }
@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import livreur_stats, stats, stock, zones
+from .models import Commande
+from .realtime import publish_commande_event
+
+
+BATCH_SIZE = 500
+
+
+def item_errors(items, failed, field, message):
+    """Erreurs alignées sur la liste reçue : un dict (vide si l'élément est valide) par élément."""
+    return {'commandes': [{field: [message]} if failed(item) else {} for item in items]}
+
+
+def reserve_all(quantites):
+    """Réserve le stock de chaque bouteille ; renvoie les ids dont le stock est insuffisant."""
+    return {
+        bouteille_id for bouteille_id, quantite in quantites.items()
+        if not stock.reserve(bouteille_id, quantite)
+    }
+
+
+def create_commandes(client, items, bouteilles):
+    """
+    Crée les commandes d'un lot en une transaction : un UPDATE de stock par
+    bouteille distincte, puis un seul bulk_create. Le lot est refusé en entier
+    si le stock d'une bouteille ne couvre pas la somme des quantités demandées.
+    """
+    commandes = []
+    for item in items:
+        bouteille = bouteilles[item['bouteille_id']]
+        latitude, longitude = item.get('latitude'), item.get('longitude')
+        zone = zones.resolve(latitude, longitude)
+        frais_livraison = zone.frais_livraison if zone else 0
+        prix_total = bouteille.prix * item['quantite']
+        commandes.append(Commande(
+            client=client,
+            bouteille=bouteille,
+            station=bouteille.station,
+            zone=zone,
+            quantite=item['quantite'],
+            prix_total=prix_total,
+            frais_livraison=frais_livraison,
+            montant_total=prix_total + frais_livraison,
+            adresse_livraison=item['adresse_livraison'],
+            latitude_livraison=latitude,
+            longitude_livraison=longitude,
+            notes=item.get('notes'),
+        ))
+
+    quantites = Counter()
+    for item in items:
+        quantites[item['bouteille_id']] += item['quantite']
+
+    with transaction.atomic():
+        insuffisant = reserve_all(quantites)
+        if insuffisant:
+            raise ValidationError(item_errors(
+                items, lambda item: item['bouteille_id'] in insuffisant, 'quantite', 'Stock insuffisant.'
+            ))
+        Commande.objects.bulk_create(commandes, batch_size=BATCH_SIZE)
+        # bulk_create n'émet pas post_save : rollups et événements sont faits ici
+        stats.record_commandes(commandes)
+        for commande in commandes:
+            publish_commande_event(commande, 'commande.creee')
+    return commandes
+
+
+def update_statuts(commandes, items):
+    """
+    Applique un lot de changements de statut avec les mêmes effets de bord que
+    CommandeViewSet.update_status (stock, date de livraison, compteur du
+    livreur), regroupés par bouteille et par livreur, puis un seul bulk_update.
+    Les commandes sont relues verrouillées dans la transaction : les effets de
+    bord partent de leur statut courant, pas de celui lu par l'appelant.
+    """
+    statuts = {item['id']: item['statut'] for item in items}
+    now = timezone.now()
+    with transaction.atomic():
+        # Une requête concurrente a pu changer ces statuts depuis la lecture de la vue :
+        # deux lots « livree » ou deux réouvertures ne comptent qu'une fois
+        commandes = list(Commande.objects.select_for_update().in_bulk([c.pk for c in commandes]).values())
+        annulees = [c for c in commandes if statuts[c.pk] == 'annulee' and c.statut != 'annulee']
+        reouvertes = [c for c in commandes if c.statut == 'annulee' and statuts[c.pk] != 'annulee']
+        livrees = [c for c in commandes if statuts[c.pk] == 'livree' and c.statut != 'livree']
+
+        liberees = Counter()
+        for commande in annulees:
+            liberees[commande.bouteille_id] += commande.quantite
+        for bouteille_id, quantite in liberees.items():
+            stock.release(bouteille_id, quantite)
+
+        if reouvertes:
+            quantites = Counter()
+            for commande in reouvertes:
+                quantites[commande.bouteille_id] += commande.quantite
+            insuffisant = reserve_all(quantites)
+            if insuffisant:
+                reouvertes_ids = {c.pk for c in reouvertes if c.bouteille_id in insuffisant}
+                raise ValidationError(item_errors(
+                    items, lambda item: item['id'] in reouvertes_ids, 'statut', 'Stock insuffisant.'
+                ))
+
+        livraisons = defaultdict(int)
+        for commande in livrees:
+            commande.date_livraison = now
+            if commande.livreur_id:
+                livraisons[commande.livreur_id] += 1
+        livreur_stats.record_deliveries(livraisons)
+
+        for commande in commandes:
+            commande.statut = statuts[commande.pk]
+            # bulk_update n'applique pas auto_now
+            commande.date_modification = now
+        Commande.objects.bulk_update(
+            commandes, ['statut', 'date_livraison', 'date_modification'], batch_size=BATCH_SIZE
+        )
+        stats.record_commandes(commandes)
+        for commande in commandes:
+            publish_commande_event(commande, 'commande.statut')
+    return commandes
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+
+
+def new_version():
+    # Jeton unique plutôt qu'un compteur : si la clé est évincée, la version
+    # recréée ne retombe pas sur celle de réponses encore en cache
+    return time.time_ns()
+
+
+def version():
+    """Version partagée par tous les processus (cache commun, cf. api.checks)."""
+    return cache.get_or_set(CATALOGUE_VERSION_KEY, new_version, None)
+
+
+async def aversion():
+    return await cache.aget_or_set(CATALOGUE_VERSION_KEY, new_version, None)
+
+
+def invalidate():
+    cache.set(CATALOGUE_VERSION_KEY, new_version(), None)
+
+
+def cache_key(request, action, current_version=None):
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    if current_version is None:
+        current_version = version()
+    raw = json.dumps([current_version, action, request.get_host(), request.path, params])
+    return 'catalogue:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+
+
+def not_modified(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+class CatalogueCacheMixin:
+    """
+    Cache versionné des réponses list/retrieve du catalogue public, indexé par
+    les paramètres de requête. La version est incrémentée à chaque
+    modification de bouteille ou de station (api.signals) et à chaque
+    approbation ; l'ETag (empreinte du contenu) permet de répondre 304 sans
+    corps. Les stations, qui voient leur propre catalogue, ne sont pas servies
+    depuis le cache.
+    """
+
+    def catalogue_cacheable(self, request):
+        user = request.user
+        return not (user.is_authenticated and user.role == 'station')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.catalogue_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        key = cache_key(request, self.action)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = {'data': response.data, 'etag': compute_etag(response.data)}
+            cache.set(key, entry, getattr(settings, 'CATALOGUE_CACHE_TTL', 60))
+        else:
+            response = Response(entry['data'])
+
+        if not_modified(request, entry['etag']):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = entry['etag']
+        response['Vary'] = 'Accept, Authorization'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Positions temps réel, versions du catalogue et des zones et utilisateurs
+    authentifiés passent par le cache : il doit être commun à tous les
+    processus (workers, dispatch_livreurs), sinon chacun garde sa propre copie.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"Le cache 'default' ({backend}) est propre à chaque processus.",
+            hint="Définir REDIS_URL ou utiliser DatabaseCache (table créée par python manage.py migrate).",
+            id='api.E001',
+        )]
+    return []
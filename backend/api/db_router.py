@@ -0,0 +1,64 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_aliases():
+    # Un « réplica » qui désigne la base principale (miroir de test) n'en est pas un :
+    # sa connexion distincte ne verrait pas les transactions en cours
+    default = connections['default'].settings_dict
+    return [
+        alias for alias in connections.settings
+        if alias.startswith('replica')
+        and (connections[alias].settings_dict['NAME'], connections[alias].settings_dict.get('HOST'))
+        != (default['NAME'], default.get('HOST'))
+    ]
+
+
+def start_replica_reads():
+    return _replica_reads.set(True)
+
+
+def stop_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Envoie les lectures du bloc vers un réplica (s'il y en a de configuré)."""
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+class ReplicaRouter:
+    """
+    Lectures vers un réplica tiré au hasard, seulement dans un bloc
+    replica_reads() (actions list/retrieve, api.views.ReplicaReadMixin) ;
+    tout le reste, écritures comprises, va sur la base principale.
+    """
+
+    def db_for_read(self, model, **hints):
+        # Table du cache (DatabaseCache) : un réplica en retard servirait des entrées invalidées
+        if not _replica_reads.get() or model._meta.app_label == 'django_cache':
+            return 'default'
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        # Explicite : une instance lue sur un réplica est réécrite sur la base principale
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas contiennent les mêmes données que la base principale
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,223 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .geo import bounding_box, cell_index, haversine_km
+from .models import Livreur, Commande
+from .realtime import publish_commande_event
+from .stats import record_status_change
+from .tracking import latest_positions
+
+
+ACTIVE_STATUTS = ('assignee', 'en_cours')
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Candidate:
+    __slots__ = ('livreur', 'latitude', 'longitude', 'charge')
+
+    def __init__(self, livreur, latitude, longitude, charge):
+        self.livreur = livreur
+        self.latitude = latitude
+        self.longitude = longitude
+        self.charge = charge
+
+    @property
+    def located(self):
+        return self.latitude is not None
+
+
+class DispatchEngine:
+    """
+    Affecte automatiquement les commandes en attente aux livreurs approuvés et
+    disponibles. Un passage charge les candidats et leur charge courante en
+    deux requêtes, les indexe par cellule de grille, puis affecte toutes les
+    commandes du lot en mémoire avant d'écrire le résultat en une seule
+    requête UPDATE conditionnelle par tranche.
+    """
+
+    # Pondérations du score (plus bas = meilleur)
+    WEIGHT_DISTANCE = 1.0      # par km de trajet (livreur -> station -> client)
+    WEIGHT_CHARGE = 3.0        # par livraison déjà en cours
+    WEIGHT_NOTE = 1.5          # bonus par point de note moyenne
+    ZONE_BONUS = 4.0
+    UNLOCATED_DISTANCE_KM = 10.0
+    UPDATE_CHUNK_SIZE = 200
+
+    def __init__(self, max_charge=None, max_pickup_km=None):
+        self.max_charge = max_charge or get_setting('DISPATCH_MAX_ACTIVE_LIVRAISONS', 3)
+        self.max_pickup_km = max_pickup_km or get_setting('DISPATCH_MAX_PICKUP_KM', 15)
+        self.candidates = []
+        self.grid = {}
+        self.positions = {}
+
+    def load_candidates(self):
+        livreurs = list(
+            Livreur.objects.filter(is_approved=True, is_disponible=True, user__is_active=True)
+            .select_related('user')
+        )
+        charges = dict(
+            Commande.objects.filter(livreur__in=[l.pk for l in livreurs], statut__in=ACTIVE_STATUTS)
+            .values_list('livreur')
+            .annotate(n=Count('id'))
+        ) if livreurs else {}
+
+        self.positions = latest_positions([l.pk for l in livreurs])
+        self.candidates = []
+        self.grid = {}
+        for livreur in livreurs:
+            latitude, longitude = self.locate(livreur)
+            candidate = Candidate(livreur, latitude, longitude, charges.get(livreur.pk, 0))
+            self.candidates.append(candidate)
+            if candidate.located:
+                self.grid.setdefault(cell_index(latitude, longitude), []).append(candidate)
+        return self.candidates
+
+    def locate(self, livreur):
+        # Position temps réel (api.tracking) sinon coordonnées du profil
+        position = self.positions.get(livreur.pk)
+        if position is not None:
+            return position['latitude'], position['longitude']
+        user = livreur.user
+        if user.latitude is None or user.longitude is None:
+            return None, None
+        return float(user.latitude), float(user.longitude)
+
+    def nearby(self, latitude, longitude):
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, self.max_pickup_km)
+        lat_start, lng_start = cell_index(min_lat, min_lng)
+        lat_end, lng_end = cell_index(max_lat, max_lng)
+        for i in range(lat_start, lat_end + 1):
+            for j in range(lng_start, lng_end + 1):
+                yield from self.grid.get((i, j), ())
+
+    def score(self, candidate, commande, pickup_km, delivery_km):
+        score = (
+            self.WEIGHT_DISTANCE * (pickup_km + delivery_km)
+            + self.WEIGHT_CHARGE * candidate.charge
+            - self.WEIGHT_NOTE * float(candidate.livreur.note_moyenne)
+        )
+        if commande.zone_id and candidate.livreur.zone_id == commande.zone_id:
+            score -= self.ZONE_BONUS
+        return score
+
+    def candidate_pool(self, station):
+        """Candidats à portée de la station, avec la distance de prise en charge (km)."""
+        if station.latitude is None or station.longitude is None:
+            return [(c, self.UNLOCATED_DISTANCE_KM) for c in self.candidates]
+        pickup = (float(station.latitude), float(station.longitude))
+        pool = []
+        for candidate in self.nearby(*pickup):
+            pickup_km = haversine_km(*pickup, candidate.latitude, candidate.longitude)
+            if pickup_km <= self.max_pickup_km:
+                pool.append((candidate, pickup_km))
+        pool.extend((c, self.UNLOCATED_DISTANCE_KM) for c in self.candidates if not c.located)
+        return pool
+
+    def best_of(self, commande, pool, delivery_km):
+        best, best_score = None, None
+        for candidate, pickup_km in pool:
+            if candidate.charge >= self.max_charge:
+                continue
+            score = self.score(candidate, commande, pickup_km, delivery_km)
+            if best_score is None or score < best_score:
+                best, best_score = candidate, score
+        return best
+
+    def best_candidate(self, commande):
+        station = commande.station
+        delivery_km = 0.0
+        if (
+            station.latitude is not None and station.longitude is not None
+            and commande.latitude_livraison is not None and commande.longitude_livraison is not None
+        ):
+            delivery_km = haversine_km(
+                station.latitude, station.longitude, commande.latitude_livraison, commande.longitude_livraison
+            )
+        return self.best_of(commande, self.candidate_pool(station), delivery_km)
+
+    def plan(self, commandes):
+        assignments = []
+        for commande in commandes:
+            candidate = self.best_candidate(commande)
+            if candidate is None:
+                continue
+            candidate.charge += 1
+            assignments.append((commande, candidate.livreur))
+        return assignments
+
+    def apply(self, assignments):
+        assigned = []
+        with transaction.atomic():
+            for start in range(0, len(assignments), self.UPDATE_CHUNK_SIZE):
+                chunk = assignments[start:start + self.UPDATE_CHUNK_SIZE]
+                # Commandes encore libres, verrouillées jusqu'au commit (FOR UPDATE ; sous SQLite
+                # le verrou d'écriture est pris dès BEGIN IMMEDIATE) : un passage concurrent qui
+                # aurait choisi le même livreur ne peut pas les compter comme siennes
+                free = set(
+                    Commande.objects.select_for_update()
+                    .filter(pk__in=[commande.pk for commande, _ in chunk], statut='en_attente', livreur__isnull=True)
+                    .order_by('pk').values_list('pk', flat=True)
+                )
+                chunk = [(commande, livreur) for commande, livreur in chunk if commande.pk in free]
+                if not chunk:
+                    continue
+                Commande.objects.filter(
+                    pk__in=[commande.pk for commande, _ in chunk], statut='en_attente', livreur__isnull=True
+                ).update(
+                    livreur_id=Case(
+                        *[When(pk=commande.pk, then=Value(livreur.pk)) for commande, livreur in chunk]
+                    ),
+                    statut='assignee',
+                    date_modification=timezone.now(),
+                )
+                for commande, livreur in chunk:
+                    commande.livreur = livreur
+                    commande.statut = 'assignee'
+                    assigned.append(commande)
+            record_status_change(assigned, 'en_attente')
+            for commande in assigned:
+                publish_commande_event(commande, 'commande.assignee')
+        return assigned
+
+    def pending(self, batch_size):
+        return list(
+            Commande.objects.filter(statut='en_attente', livreur__isnull=True)
+            .select_related('station')
+            .order_by('date_commande', 'id')[:batch_size]
+        )
+
+    def dispatch(self, commandes):
+        if not commandes:
+            return []
+        self.load_candidates()
+        return self.apply(self.plan(commandes))
+
+    def run_once(self, batch_size=None):
+        batch_size = batch_size or get_setting('DISPATCH_BATCH_SIZE', 500)
+        return self.dispatch(self.pending(batch_size))
+
+    def run_forever(self, interval=None, batch_size=None, stdout=None):
+        interval = interval or get_setting('DISPATCH_INTERVAL_SECONDS', 5)
+        while True:
+            started = time.monotonic()
+            assigned = self.run_once(batch_size)
+            if stdout and assigned:
+                stdout.write(f'{len(assigned)} commande(s) affectée(s)')
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+def annotate_charge(queryset):
+    # Sous-requête corrélée : s'appuie sur l'index (livreur, statut) plutôt qu'une jointure groupée
+    charge = (
+        Commande.objects.filter(livreur=OuterRef('pk'), statut__in=ACTIVE_STATUTS)
+        .order_by().values('livreur').annotate(n=Count('id')).values('n')
+    )
+    return queryset.annotate(charge=Coalesce(Subquery(charge), 0))
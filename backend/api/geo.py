@@ -0,0 +1,105 @@
+import math
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Taille d'une cellule de la grille d'index (~11 km à l'équateur)
+CELL_SIZE_DEG = 0.1
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 100
+# Au-delà, la liste des cellules devient plus coûteuse que la seule bounding box
+MAX_CELLS = 500
+
+
+def cell_index(latitude, longitude):
+    return math.floor(float(latitude) / CELL_SIZE_DEG), math.floor(float(longitude) / CELL_SIZE_DEG)
+
+
+def format_cell(lat_index, lng_index):
+    return f'{lat_index}:{lng_index}'
+
+
+def geo_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return ''
+    return format_cell(*cell_index(latitude, longitude))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180)
+    return latitude - dlat, latitude + dlat, longitude - dlng, longitude + dlng
+
+
+def cells_in_box(min_lat, max_lat, min_lng, max_lng):
+    lat_start, lng_start = cell_index(min_lat, min_lng)
+    lat_end, lng_end = cell_index(max_lat, max_lng)
+    count = (lat_end - lat_start + 1) * (lng_end - lng_start + 1)
+    if count > MAX_CELLS:
+        return None
+    return [
+        format_cell(i, j)
+        for i in range(lat_start, lat_end + 1)
+        for j in range(lng_start, lng_end + 1)
+    ]
+
+
+def parse_near(near, radius=None):
+    """Décode `?near=lat,lng&radius=km`. Lève ValueError si les valeurs sont invalides."""
+    try:
+        lat_str, lng_str = near.split(',')
+        latitude, longitude = float(lat_str), float(lng_str)
+    except (AttributeError, ValueError):
+        raise ValueError("Le paramètre near doit être de la forme 'latitude,longitude'.")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordonnées hors limites.')
+    radius_km = DEFAULT_RADIUS_KM
+    if radius not in (None, ''):
+        try:
+            radius_km = float(radius)
+        except ValueError:
+            raise ValueError('Le paramètre radius doit être un nombre (km).')
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f'Le rayon doit être compris entre 0 et {MAX_RADIUS_KM} km.')
+    return latitude, longitude, radius_km
+
+
+def filter_near(queryset, latitude, longitude, radius_km, prefix=''):
+    """
+    Préfiltre par cellules de grille et bounding box en base, puis classe par
+    distance haversine exacte. Renvoie une liste triée dont chaque objet porte
+    un attribut `distance_km`.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    filters = {
+        f'{prefix}latitude__gte': min_lat,
+        f'{prefix}latitude__lte': max_lat,
+        f'{prefix}longitude__gte': min_lng,
+        f'{prefix}longitude__lte': max_lng,
+    }
+    cells = cells_in_box(min_lat, max_lat, min_lng, max_lng)
+    if cells is not None:
+        filters[f'{prefix}geo_cell__in'] = cells
+
+    owner_attrs = prefix.rstrip('_').split('__') if prefix else []
+    results = []
+    for obj in queryset.filter(**filters):
+        located = obj
+        for attr in owner_attrs:
+            located = getattr(located, attr)
+        distance = haversine_km(latitude, longitude, located.latitude, located.longitude)
+        if distance <= radius_km:
+            obj.distance_km = round(distance, 3)
+            results.append(obj)
+    results.sort(key=lambda obj: obj.distance_km)
+    return results
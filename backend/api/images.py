@@ -0,0 +1,264 @@
+"""
+Déclinaisons des images du catalogue (Bouteille.image, Station.logo) :
+miniature pour les listes et taille détail, en WebP et en JPEG. Générées
+après chaque envoi dans un pool de threads, hors de la requête ; les images
+déjà en place sont traitées par `python manage.py generate_image_variants`
+(pool de processus).
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from . import catalogue
+from .models import Bouteille, Station
+
+
+logger = logging.getLogger(__name__)
+
+# Modèle -> champ image ; les déclinaisons sont dans `<champ>_variants`
+IMAGE_FIELDS = {Bouteille: 'image', Station: 'logo'}
+
+# Format -> (format Pillow, options d'encodage)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def variant_sizes():
+    """Nom de la déclinaison -> plus grand côté (px)."""
+    return get_setting('IMAGE_VARIANTS', {'miniature': 320, 'detail': 1080})
+
+
+def variants_field(field):
+    return f'{field}_variants'
+
+
+def flatten(image):
+    # JPEG sans transparence : fond blanc
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def encode(image, ext):
+    fmt, options = FORMATS[ext]
+    buffer = io.BytesIO()
+    (flatten(image) if fmt == 'JPEG' else image).save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def render_variants(data, sizes):
+    """
+    Redimensionne l'image `data` (octets) à chaque taille, sans agrandir :
+    {déclinaison: {'largeur', 'hauteur', 'webp': octets, 'jpeg': octets}}.
+    N'utilise que Pillow, pour pouvoir tourner dans un autre processus.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEG : décodage directement à une échelle réduite, proche de la plus grande taille
+        largest = max(sizes.values())
+        source.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+
+    rendered = {}
+    # Du plus grand au plus petit : chaque taille part de la précédente
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        rendered[name] = {
+            'largeur': image.width,
+            'hauteur': image.height,
+            **{ext: encode(image, ext) for ext in FORMATS},
+        }
+    return rendered
+
+
+def variant_names(variants):
+    for name, entry in variants.items():
+        if name == 'source':
+            continue
+        for ext in FORMATS:
+            if entry.get(ext):
+                yield entry[ext]
+
+
+def store(storage, source, rendered):
+    """Écrit les fichiers à côté de la source (`<dossier>/variants/`) et renvoie la valeur du champ JSON."""
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    variants = {'source': source}
+    for name, result in rendered.items():
+        entry = {'largeur': result['largeur'], 'hauteur': result['hauteur']}
+        for ext in FORMATS:
+            target = posixpath.join(directory, 'variants', f'{stem}_{name}.{ext}')
+            # Nom stable : une nouvelle génération remplace les fichiers précédents
+            storage.delete(target)
+            entry[ext] = storage.save(target, ContentFile(result[ext]))
+        variants[name] = entry
+    return variants
+
+
+def delete_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def save_variants(model, pk, field, source, variants):
+    """
+    Enregistre les déclinaisons si l'image n'a pas changé entre-temps (sinon
+    elles sont supprimées : un traitement plus récent est en file).
+    """
+    storage = model._meta.get_field(field).storage
+    json_field = variants_field(field)
+    current = Q(**{field: source}) if source else Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+    previous = model.objects.filter(pk=pk).values_list(json_field, flat=True).first() or {}
+    if not model.objects.filter(current, pk=pk).update(**{json_field: variants}):
+        delete_files(storage, variant_names(variants))
+        return False
+    kept = set(variant_names(variants))
+    delete_files(storage, (name for name in variant_names(previous) if name not in kept))
+    # Les réponses du catalogue incluent les URLs des déclinaisons
+    catalogue.invalidate()
+    return True
+
+
+def process(model, pk, field, source):
+    storage = model._meta.get_field(field).storage
+    variants = {}
+    if source:
+        with storage.open(source, 'rb') as f:
+            data = f.read()
+        variants = store(storage, source, render_variants(data, variant_sizes()))
+    return save_variants(model, pk, field, source, variants)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting('IMAGE_VARIANT_WORKERS', 2), thread_name_prefix='image-variants'
+            )
+    return _executor
+
+
+def run(model, pk, field, source):
+    try:
+        process(model, pk, field, source)
+    except Exception:
+        logger.exception("Échec de la génération des déclinaisons de %s #%s", model.__name__, pk)
+    finally:
+        connection.close()
+
+
+def schedule(instance):
+    """
+    Appelé après chaque enregistrement (api.signals) : si l'image a changé
+    depuis la dernière génération, les déclinaisons sont recalculées après
+    le commit, dans le pool de threads.
+    """
+    field = IMAGE_FIELDS[type(instance)]
+    source = getattr(instance, field).name or ''
+    if source == getattr(instance, variants_field(field)).get('source', ''):
+        return
+    args = (type(instance), instance.pk, field, source)
+    if get_setting('IMAGE_VARIANTS_BACKGROUND', True):
+        transaction.on_commit(lambda: executor().submit(run, *args))
+    else:
+        transaction.on_commit(lambda: process(*args))
+
+
+def variant_urls(variants, request=None):
+    """Valeur de `<champ>_variants` -> URLs des fichiers (absolues si `request` est fourni)."""
+    urls = {}
+    for name, entry in variants.items():
+        if name == 'source':
+            continue
+        urls[name] = {'largeur': entry['largeur'], 'hauteur': entry['hauteur']}
+        for ext in FORMATS:
+            url = default_storage.url(entry[ext])
+            urls[name][ext] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def pending(model, force=False):
+    field = IMAGE_FIELDS[model]
+    rows = (
+        model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        .order_by('pk').values_list('pk', field, variants_field(field))
+    )
+    for pk, source, variants in rows.iterator():
+        if force or (variants or {}).get('source') != source:
+            yield pk, source
+
+
+def backfill(models=None, workers=None, force=False, batch_size=50, stdout=None):
+    """
+    Génère les déclinaisons manquantes (ou toutes avec `force`) : lecture et
+    écriture des fichiers dans ce processus, redimensionnement et encodage
+    répartis sur un pool de processus. Renvoie (générées, échecs).
+    """
+    sizes = variant_sizes()
+    generated = failed = 0
+    # initializer : sans fork (macOS, Windows), les workers importent api.images après django.setup()
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        for model in models or IMAGE_FIELDS:
+            field = IMAGE_FIELDS[model]
+            storage = model._meta.get_field(field).storage
+            batch = []
+            for row in pending(model, force):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    counts = backfill_batch(pool, model, field, storage, batch, sizes)
+                    generated, failed = generated + counts[0], failed + counts[1]
+                    batch = []
+                    if stdout:
+                        stdout.write(f'  {model.__name__}: {generated} générées, {failed} échecs')
+            if batch:
+                counts = backfill_batch(pool, model, field, storage, batch, sizes)
+                generated, failed = generated + counts[0], failed + counts[1]
+    return generated, failed
+
+
+def backfill_batch(pool, model, field, storage, batch, sizes):
+    generated = failed = 0
+    futures = []
+    for pk, source in batch:
+        try:
+            with storage.open(source, 'rb') as f:
+                futures.append((pk, source, pool.submit(render_variants, f.read(), sizes)))
+        except OSError:
+            logger.warning("Image introuvable : %s #%s (%s)", model.__name__, pk, source)
+            failed += 1
+    for pk, source, future in futures:
+        try:
+            rendered = future.result()
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.warning("Image illisible : %s #%s (%s)", model.__name__, pk, source)
+            failed += 1
+            continue
+        if save_variants(model, pk, field, source, store(storage, source, rendered)):
+            generated += 1
+    return generated, failed
@@ -0,0 +1,47 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Commande
+
+
+# Marge de relecture de `?since=` : une commande enregistrée juste avant la
+# requête précédente mais validée après n'est pas perdue. Les clients
+# dédoublonnent par id.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def start_of_day(day):
+    """Minuit (fuseau courant) du jour donné."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def restrict(queryset, filters):
+    """Filtres de période et de livreur, communs à la liste et aux compteurs."""
+    # Bornes en datetime plutôt que `__date` : l'index (station, -date_commande) reste utilisable
+    if filters.get('date_debut'):
+        queryset = queryset.filter(date_commande__gte=start_of_day(filters['date_debut']))
+    if filters.get('date_fin'):
+        queryset = queryset.filter(date_commande__lt=start_of_day(filters['date_fin'] + timedelta(days=1)))
+    if filters.get('livreur'):
+        queryset = queryset.filter(livreur_id=filters['livreur'])
+    return queryset
+
+
+def select(queryset, filters):
+    """Filtres propres à la liste : statuts demandés et synchronisation incrémentale."""
+    if filters.get('statut'):
+        queryset = queryset.filter(statut__in=filters['statut'])
+    if filters.get('since'):
+        queryset = queryset.filter(date_modification__gte=filters['since'] - SYNC_OVERLAP)
+    return queryset
+
+
+def status_counts(queryset):
+    """Nombre de commandes par statut (tous les statuts, 0 inclus) en une requête GROUP BY."""
+    counts = dict.fromkeys(dict(Commande.STATUT_CHOICES), 0)
+    rows = queryset.order_by().values_list('statut').annotate(total=Count('id'))
+    counts.update(rows)
+    counts['total'] = sum(counts.values())
+    return counts
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models import F, FloatField, DecimalField
+from django.db.models.functions import Cast
+
+from .models import Livreur, Evaluation
+
+
+def record_deliveries(counts):
+    """Incrémente nombre_livraisons en base (UPDATE ... SET n = n + k), par id de livreur."""
+    for livreur_id, nombre in counts.items():
+        if nombre:
+            Livreur.objects.filter(pk=livreur_id).update(nombre_livraisons=F('nombre_livraisons') + nombre)
+
+
+def running_average(note):
+    # Les F() désignent les valeurs avant l'UPDATE : la moyenne inclut déjà la nouvelle note
+    return Cast(
+        Cast(F('somme_notes') + note, FloatField()) / (F('nombre_evaluations') + 1),
+        DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def rate(commande, note, commentaire=None):
+    """
+    Enregistre l'évaluation du livreur d'une commande et met à jour ses
+    compteurs dans le même UPDATE, sans relire les évaluations existantes.
+    L'unicité de Evaluation.commande empêche de compter deux fois une commande.
+    """
+    with transaction.atomic():
+        evaluation = Evaluation.objects.create(
+            commande=commande, livreur_id=commande.livreur_id, note=note, commentaire=commentaire,
+        )
+        Livreur.objects.filter(pk=commande.livreur_id).update(
+            note_moyenne=running_average(note),
+            somme_notes=F('somme_notes') + note,
+            nombre_evaluations=F('nombre_evaluations') + 1,
+        )
+    return evaluation
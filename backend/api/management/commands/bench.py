@@ -0,0 +1,100 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesures de performance de l'API. `listes` : latence des endpoints de liste, avec et "
+        "sans les index composites ; `api` : chaque route GET du routeur et les écritures du "
+        "parcours commande ; `async` : vues DRF en WSGI face à /api/async/ en ASGI, sous charge."
+    )
+
+    def add_arguments(self, parser):
+        modes = parser.add_subparsers(dest='mode', required=True)
+
+        listes = modes.add_parser('listes', help="Endpoints de liste, avant/après index.")
+        listes.add_argument('--iterations', type=int, default=50)
+        listes.add_argument('--compare-indexes', action='store_true',
+                            help="Mesure aussi sans les index de Meta.indexes (avant/après).")
+        listes.add_argument('--allow-drop', action='store_true',
+                            help="Autorise --compare-indexes hors d'une base de test.")
+        listes.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+        api = modes.add_parser('api', help="Routes du routeur et écritures, rapport comparable entre commits.")
+        api.add_argument('--iterations', type=int, default=50)
+        api.add_argument('--baseline', help="Rapport JSON précédent : ajoute les écarts en %%.")
+
+        charge = modes.add_parser('async', help="WSGI (pool de threads) face à ASGI, sous charge.")
+        charge.add_argument('--concurrency', type=int, default=50, help="Connexions simultanées côté ASGI.")
+        charge.add_argument('--requests', type=int, default=500, help="Requêtes par endpoint et par mode.")
+        charge.add_argument('--wsgi-workers', type=int, default=8, help="Threads du déploiement WSGI.")
+        charge.add_argument(
+            '--db-latency-ms', type=float, default=0,
+            help="Latence ajoutée à chaque requête SQL (base distante simulée).",
+        )
+
+        for mode in (listes, api, charge):
+            mode.add_argument('--seed', type=int, default=0,
+                              help="Génère d'abord N commandes synthétiques (ex. 1000000).")
+        for mode in (api, charge):
+            mode.add_argument('--output', help="Fichier JSON où écrire le rapport.")
+
+    def handle(self, *args, **options):
+        if options.get('compare_indexes'):
+            # Avant toute écriture : pas de génération sur une base qu'on refuse ensuite de toucher
+            try:
+                benchmark.check_can_drop_indexes(options['allow_drop'])
+            except benchmark.BenchmarkError as exc:
+                raise CommandError(str(exc))
+        if options['seed']:
+            self.stdout.write(f"Génération de {options['seed']} commandes...")
+            benchmark.seed(commandes=options['seed'], stdout=self.stdout)
+
+        if options['mode'] == 'listes':
+            self.listes(options)
+            return
+        if options['mode'] == 'api':
+            report = benchmark.run_all(options['iterations'])
+            if options['baseline']:
+                with open(options['baseline']) as f:
+                    benchmark.compare(report, json.load(f))
+        else:
+            report = benchmark.run_async_comparison(
+                concurrency=options['concurrency'], requests=options['requests'],
+                wsgi_workers=options['wsgi_workers'], db_latency_ms=options['db_latency_ms'],
+            )
+        self.write_report(report, options['output'])
+
+    def listes(self, options):
+        report = {}
+        if options['compare_indexes']:
+            try:
+                with benchmark.without_indexes(allow_drop=options['allow_drop']):
+                    report['avant'] = benchmark.run(options['iterations'])
+            except benchmark.BenchmarkError as exc:
+                raise CommandError(str(exc))
+        report['apres'] = benchmark.run(options['iterations'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        before = {row['name']: row for row in report.get('avant', [])}
+        self.stdout.write(f"{'endpoint':<28}{'p50 avant':>11}{'p99 avant':>11}{'p50':>9}{'p99':>9}{'req':>5}")
+        for row in report['apres']:
+            old = before.get(row['name'], {})
+            self.stdout.write(
+                f"{row['name']:<28}{old.get('p50_ms', '-'):>11}{old.get('p99_ms', '-'):>11}"
+                f"{row['p50_ms']:>9}{row['p99_ms']:>9}{row['queries']:>5}"
+            )
+
+    def write_report(self, report, path):
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if path:
+            with open(path, 'w') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {path}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.dispatch import DispatchEngine
+from api.routing import TourneePlanner
+
+
+class Command(BaseCommand):
+    help = "Affecte automatiquement les commandes en attente aux livreurs disponibles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Un seul passage puis sortie.")
+        parser.add_argument('--interval', type=float, default=None, help="Secondes entre deux passages.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Commandes traitées par passage.")
+        parser.add_argument(
+            '--tournees', action='store_true',
+            help="Regroupe les commandes d'une même station en tournées multi-arrêts."
+        )
+
+    def handle(self, *args, **options):
+        engine = TourneePlanner() if options['tournees'] else DispatchEngine()
+        if options['once']:
+            assigned = engine.run_once(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{len(assigned)} commande(s) affectée(s)'))
+            return
+        self.stdout.write('Dispatch démarré (Ctrl+C pour arrêter)')
+        try:
+            engine.run_forever(options['interval'], options['batch_size'], stdout=self.stdout)
+        except KeyboardInterrupt:
+            pass
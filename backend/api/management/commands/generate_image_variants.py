@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les déclinaisons (miniature, détail ; WebP et JPEG) des images de bouteilles "
+        "et des logos de stations qui n'en ont pas encore, dans un pool de processus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Processus (par défaut : nombre de CPU).")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--force', action='store_true', help="Régénère aussi les déclinaisons existantes.")
+
+    def handle(self, *args, **options):
+        generated, failed = images.backfill(
+            workers=options['workers'], force=options['force'],
+            batch_size=options['batch_size'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f'{generated} image(s) traitée(s), {failed} échec(s).'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import tracking
+
+
+class Command(BaseCommand):
+    help = "Supprime les positions GPS des livreurs plus anciennes que la durée de rétention."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Rétention en jours (TRACKING_RETENTION_DAYS par défaut).")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Répète la purge toutes les N secondes au lieu d'une seule fois.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = tracking.prune(options['days'])
+            self.stdout.write(self.style.SUCCESS(f'{deleted} position(s) supprimée(s)'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    help = "Génère un jeu de données synthétique (Douala / Yaoundé) pour les tests de charge."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--commandes', type=int, default=100_000)
+        parser.add_argument('--stations', type=int, default=200)
+        parser.add_argument('--clients', type=int, default=20_000)
+        parser.add_argument('--livreurs', type=int, default=2_000)
+        parser.add_argument('--days', type=int, default=365, help="Période couverte par les commandes.")
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Lignes par bulk_create.")
+        parser.add_argument('--prefix', default='bench', help="Préfixe des emails et références générés.")
+        parser.add_argument('--no-paiements', action='store_true')
+        parser.add_argument('--random-seed', type=int, default=42, help="Graine : même graine, mêmes données.")
+
+    def handle(self, *args, **options):
+        created = benchmark.seed(
+            commandes=options['commandes'],
+            stations=options['stations'],
+            clients=options['clients'],
+            livreurs=options['livreurs'],
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+            prefix=options['prefix'],
+            paiements=not options['no_paiements'],
+            stdout=self.stdout,
+            rng=random.Random(options['random_seed']),
+        )
+        self.stdout.write(self.style.SUCCESS(f'{created} commande(s) générée(s)'))
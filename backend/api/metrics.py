@@ -0,0 +1,152 @@
+"""
+Métriques HTTP par vue, exposées au format texte Prometheus sur
+/api/admin/metrics/ (api.middleware.MetricsMiddleware). Les compteurs sont
+propres à chaque processus : avec plusieurs workers gunicorn, chaque scrape
+ne voit que le worker qui répond.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'gazexpress'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+class QueryRecorder:
+    """Compte les requêtes SQL d'une requête HTTP (via record_query) et en garde le texte."""
+
+    MAX_STATEMENTS = 200
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.seconds += duration
+            if len(self.statements) < self.MAX_STATEMENTS:
+                self.statements.append((duration, sql))
+
+    def slowest(self, limit=10):
+        return sorted(self.statements, key=lambda statement: statement[0], reverse=True)[:limit]
+
+
+# Enregistreur de la requête HTTP en cours ; le contexte suit les requêtes
+# SQL exécutées dans un thread par l'ORM asynchrone (sync_to_async)
+current_recorder = ContextVar('metrics_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection):
+    """Branché sur connection_created (api.signals) : chaque connexion, de chaque thread, est instrumentée."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = defaultdict(int)
+        self.latency = {}
+        self.queries = {}
+        self.sizes = {}
+        self.db_seconds = defaultdict(float)
+
+    def histogram(self, store, key, buckets):
+        histogram = store.get(key)
+        if histogram is None:
+            histogram = store[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, view, method, status, seconds, queries, db_seconds, size):
+        key = (view, method)
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            self.histogram(self.latency, key, LATENCY_BUCKETS).observe(seconds)
+            self.histogram(self.queries, key, QUERY_BUCKETS).observe(queries)
+            self.histogram(self.sizes, key, SIZE_BUCKETS).observe(size)
+            self.db_seconds[key] += db_seconds
+
+    def render(self):
+        lines = []
+        with self.lock:
+            name = f'{PREFIX}_http_requests_total'
+            lines += [f'# HELP {name} Requêtes HTTP par vue, méthode et code de statut.', f'# TYPE {name} counter']
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f"{name}{format_labels([('view', view), ('method', method), ('status', status)])} {count}")
+
+            for name, help_text, store in (
+                (f'{PREFIX}_http_request_duration_seconds', 'Latence des requêtes HTTP.', self.latency),
+                (f'{PREFIX}_db_queries_per_request', 'Requêtes SQL par requête HTTP.', self.queries),
+                (f'{PREFIX}_http_response_size_bytes', 'Taille du corps des réponses.', self.sizes),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (view, method), histogram in sorted(store.items()):
+                    labels = [('view', view), ('method', method)]
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{format_labels(labels + [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{format_labels(labels + [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+
+            name = f'{PREFIX}_db_query_duration_seconds_total'
+            lines += [f'# HELP {name} Temps passé en base par vue.', f'# TYPE {name} counter']
+            for (view, method), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"{name}{format_labels([('view', view), ('method', method)])} {seconds:.6f}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
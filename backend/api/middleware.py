@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from .metrics import QueryRecorder, current_recorder, registry
+
+try:
+    import fcntl
+except ImportError:  # Windows : file d'attente limitée au processus
+    fcntl = None
+
+
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+slow_logger = logging.getLogger('api.metrics')
+
+
+class WriterQueue:
+    """
+    Verrou d'écrivain unique : un verrou de thread pour le processus, puis un
+    verrou fcntl sur un fichier voisin de la base pour les autres workers.
+    Les écritures attendent leur tour (jusqu'à `timeout` secondes) au lieu
+    d'échouer sur « database is locked ».
+    """
+
+    POLL_SECONDS = 0.005
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        if not self.lock.acquire(timeout=self.timeout):
+            return None
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    self.lock.release()
+                    return None
+                time.sleep(self.POLL_SECONDS)
+
+    def release(self, handle):
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            os.close(handle)
+        self.lock.release()
+
+
+def queues_writes(request):
+    """
+    La vue visée écrit-elle en base ? Elle le déclare par l'attribut
+    `sqlite_write_queue` ; une action DRF peut le redéfinir
+    (`@action(..., sqlite_write_queue=False)`).
+    """
+    if request.method not in UNSAFE_METHODS:
+        return False
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    initkwargs = getattr(match.func, 'initkwargs', {})
+    if 'sqlite_write_queue' in initkwargs:
+        return initkwargs['sqlite_write_queue']
+    return getattr(getattr(match.func, 'cls', match.func), 'sqlite_write_queue', False)
+
+
+class SQLiteWriteQueueMiddleware:
+    """
+    Sérialise les requêtes d'écriture quand la base principale est SQLite
+    (un seul écrivain à la fois de toute façon) : sous contention, la création
+    de commandes attend au lieu de renvoyer une erreur 500. Au-delà de
+    SQLITE_WRITE_QUEUE_TIMEOUT secondes d'attente, réponse 503 avec Retry-After.
+    Seules les vues déclarant `sqlite_write_queue = True` passent par la file :
+    connexion, rafraîchissement du jeton ou envoi des positions GPS (mises en
+    tampon) n'attendent pas derrière les écritures.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if connections['default'].vendor != 'sqlite' or not getattr(settings, 'SQLITE_WRITE_QUEUE', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.timeout = getattr(settings, 'SQLITE_WRITE_QUEUE_TIMEOUT', 30)
+        self.queues = {}
+        self.queues_lock = threading.Lock()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_queue(self):
+        # Le nom de la base est lu à chaque requête (il change pour la base de test)
+        path = f"{connections['default'].settings_dict['NAME']}.write.lock"
+        with self.queues_lock:
+            if path not in self.queues:
+                self.queues[path] = WriterQueue(path, self.timeout)
+            return self.queues[path]
+
+    def busy(self):
+        response = JsonResponse({'error': 'Serveur occupé, veuillez réessayer.'}, status=503)
+        response['Retry-After'] = '1'
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not queues_writes(request):
+            return self.get_response(request)
+        queue = self.get_queue()
+        handle = queue.acquire()
+        if handle is None:
+            return self.busy()
+        try:
+            return self.get_response(request)
+        finally:
+            queue.release(handle)
+
+    async def __acall__(self, request):
+        if not queues_writes(request):
+            return await self.get_response(request)
+        queue = self.get_queue()
+        # Attente du verrou hors de la boucle d'événements
+        handle = await sync_to_async(queue.acquire, thread_sensitive=False)()
+        if handle is None:
+            return self.busy()
+        try:
+            return await self.get_response(request)
+        finally:
+            queue.release(handle)
+
+
+class MetricsMiddleware:
+    """
+    Mesure chaque requête : latence, nombre et durée des requêtes SQL (toutes
+    bases), taille de la réponse et statut, agrégés par vue dans
+    api.metrics.registry. Au-delà de METRICS_SLOW_REQUEST_MS, la requête est
+    journalisée (logger api.metrics) avec ses requêtes SQL les plus lentes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    def observe(self, request, response, duration, recorder):
+        match = request.resolver_match
+        view = (match.view_name or match.route) if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, recorder.count, recorder.seconds, size)
+
+        if duration * 1000 >= getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500):
+            self.log_slow(request, response, duration, recorder)
+
+    def log_slow(self, request, response, duration, recorder):
+        statements = '\n'.join(f'  {seconds * 1000:.1f} ms  {sql}' for seconds, sql in recorder.slowest())
+        slow_logger.warning(
+            'Requête lente %s %s -> %s en %.0f ms (%d requêtes SQL, %.0f ms en base)\n%s',
+            request.method, request.get_full_path(), response.status_code, duration * 1000,
+            recorder.count, recorder.seconds * 1000, statements,
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:18
+
+from django.db import migrations, models
+
+from api.geo import geo_cell
+
+
+def fill_geo_cells(apps, schema_editor):
+    for model_name in ('User', 'Station'):
+        model = apps.get_model('api', model_name)
+        rows = model.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        updated = []
+        for obj in rows.only('pk', 'latitude', 'longitude').iterator():
+            obj.geo_cell = geo_cell(obj.latitude, obj.longitude)
+            updated.append(obj)
+        model.objects.bulk_update(updated, ['geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='zone',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commandes', to='api.zone'),
+        ),
+    ]
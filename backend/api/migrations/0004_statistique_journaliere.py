@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api import stats
+
+
+def backfill_statistiques(apps, schema_editor):
+    stats.rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_commande_zone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiqueJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('assignee', 'Assignée'), ('en_cours', 'En cours de livraison'), ('livree', 'Livrée'), ('annulee', 'Annulée')], max_length=20)),
+                ('nombre_commandes', models.IntegerField(default=0)),
+                ('montant_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistiques', to='api.station')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière',
+                'verbose_name_plural': 'Statistiques journalières',
+                'indexes': [models.Index(fields=['jour', 'statut'], name='stat_jour_statut_idx')],
+                'constraints': [models.UniqueConstraint(fields=('jour', 'station', 'statut'), name='unique_statistique_jour')],
+            },
+        ),
+        migrations.RunPython(backfill_statistiques, migrations.RunPython.noop),
+    ]
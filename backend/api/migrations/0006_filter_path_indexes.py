@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_keyset_pagination_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bouteille',
+            index=models.Index(fields=['station', 'disponible', 'type'], name='bouteille_catalogue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['client', '-date_commande', '-id'], name='commande_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['station', 'statut'], name='commande_station_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['livreur', 'statut'], name='commande_livreur_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livreur',
+            index=models.Index(fields=['is_approved', 'is_disponible'], name='livreur_dispo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_approved'], name='user_role_approved_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_filter_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionLivreur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('horodatage', models.DateTimeField()),
+                ('precision', models.FloatField(blank=True, null=True)),
+                ('vitesse', models.FloatField(blank=True, null=True)),
+                ('livreur', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='api.livreur')),
+            ],
+            options={
+                'verbose_name': 'Position livreur',
+                'verbose_name_plural': 'Positions livreurs',
+                'indexes': [models.Index(fields=['livreur', '-horodatage'], name='position_livreur_date_idx'), models.Index(fields=['horodatage'], name='position_date_idx')],
+            },
+        ),
+    ]
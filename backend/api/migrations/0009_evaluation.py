@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_zone_geometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livreur',
+            name='nombre_evaluations',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='livreur',
+            name='somme_notes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Evaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note', models.PositiveSmallIntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')])),
+                ('commentaire', models.TextField(blank=True, null=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('commande', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation', to='api.commande')),
+                ('livreur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='api.livreur')),
+            ],
+            options={
+                'verbose_name': 'Évaluation',
+                'verbose_name_plural': 'Évaluations',
+                'indexes': [models.Index(fields=['livreur', '-date_creation'], name='evaluation_livreur_date_idx')],
+            },
+        ),
+    ]
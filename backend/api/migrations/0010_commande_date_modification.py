@@ -0,0 +1,32 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_date_modification(apps, schema_editor):
+    Commande = apps.get_model('api', 'Commande')
+    Commande.objects.update(date_modification=models.F('date_commande'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_date_modification, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['station', '-date_commande', '-id'], name='commande_station_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['station', 'date_modification'], name='commande_station_modif_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_commande_date_modification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='ordre_tournee',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='livreur',
+            name='capacite',
+            field=models.PositiveSmallIntegerField(default=6),
+        ),
+        migrations.CreateModel(
+            name='Tournee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('livreur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournees', to='api.livreur')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournees', to='api.station')),
+            ],
+            options={
+                'verbose_name': 'Tournée',
+                'verbose_name_plural': 'Tournées',
+            },
+        ),
+        migrations.AddField(
+            model_name='commande',
+            name='tournee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commandes', to='api.tournee'),
+        ),
+        migrations.AddIndex(
+            model_name='tournee',
+            index=models.Index(fields=['livreur', '-date_creation'], name='tournee_livreur_date_idx'),
+        ),
+    ]
@@ -2,8 +2,74 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 import uuid
 
+from .geo import geo_cell
 
-class User(AbstractUser):
+
+class FieldTrackerMixin:
+    """
+    Suivi des modifications depuis l'état chargé, sans relire la ligne en base.
+    `tracked_fields` liste les noms de champs suivis ; l'état est mémorisé au
+    chargement (from_db) puis après chaque save, pour les seuls champs écrits
+    quand update_fields est fourni.
+    """
+    tracked_fields = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+    
+    def tracked_attnames(self, names=None):
+        names = self.tracked_fields if names is None else [n for n in self.tracked_fields if n in names]
+        return [self._meta.get_field(name).attname for name in names]
+    
+    def reset_tracking(self, names=None):
+        fields = self.__dict__
+        loaded = dict(getattr(self, '_loaded_state', {}))
+        for attname in self.tracked_attnames(names):
+            if attname in fields:
+                loaded[attname] = fields[attname]
+        self._loaded_state = loaded
+    
+    def loaded_state(self):
+        """Valeurs chargées (par attname) ; vide pour une instance jamais enregistrée."""
+        return getattr(self, '_loaded_state', {})
+    
+    def has_changed(self, name):
+        attname = self._meta.get_field(name).attname
+        loaded = self.loaded_state()
+        if attname not in loaded:
+            # Jamais chargé (nouvelle instance ou champ différé) : modifié s'il a été affecté
+            return attname in self.__dict__
+        return self.__dict__.get(attname, loaded[attname]) != loaded[attname]
+    
+    def changed_fields(self):
+        return [name for name in self.tracked_fields if self.has_changed(name)]
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self.reset_tracking(None if update_fields is None else set(update_fields))
+
+
+def add_update_fields(kwargs, *names):
+    # Complète update_fields (s'il est fourni) avec les champs modifiés par save()
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None:
+        kwargs['update_fields'] = {*update_fields, *names}
+    return kwargs
+
+
+def with_geo_cell(instance, kwargs):
+    instance.geo_cell = geo_cell(instance.latitude, instance.longitude)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+        kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+    return kwargs
+
+
+class User(FieldTrackerMixin, AbstractUser):
     ROLE_CHOICES = [
         ('client', 'Client'),
         ('livreur', 'Livreur'),
@@ -20,30 +86,32 @@ class User(AbstractUser):
     adresse = models.TextField(blank=True, null=True)
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    geo_cell = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
     is_active = models.BooleanField(default=True)
     is_approved = models.BooleanField(default=True)
     date_creation = models.DateTimeField(auto_now_add=True)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'nom', 'prenom', 'telephone']
+    tracked_fields = ('role',)
     
     def save(self, *args, **kwargs):
-        if self.pk:
-            try:
-                old_user = User.objects.get(pk=self.pk)
-                if old_user.role != self.role and self.role in ['station', 'livreur']:
-                    self.is_approved = False
-            except User.DoesNotExist:
-                pass
-        elif self.role in ['station', 'livreur']:
+        # Changement de rôle détecté depuis l'état chargé, sans relire l'utilisateur
+        if self.role in ['station', 'livreur'] and (self._state.adding or self.has_changed('role')):
             self.is_approved = False
+            add_update_fields(kwargs, 'is_approved')
         if not self.username:
             self.username = self.email
-        super().save(*args, **kwargs)
+            add_update_fields(kwargs, 'username')
+        super().save(*args, **with_geo_cell(self, kwargs))
     
     class Meta:
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
+        indexes = [
+            # PendingApprovalsView, UserViewSet?role=
+            models.Index(fields=['role', 'is_approved'], name='user_role_approved_idx'),
+        ]
 
 
 class Zone(models.Model):
@@ -51,6 +119,12 @@ class Zone(models.Model):
     frais_livraison = models.DecimalField(max_digits=10, decimal_places=2)
     delai_estime = models.CharField(max_length=50)
     is_active = models.BooleanField(default=True)
+    # Emprise géographique : polygone [[lat, lng], ...] ou centre + rayon.
+    # Une zone active sans emprise sert de zone par défaut (voir api.zones).
+    centre_latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
+    centre_longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    rayon_km = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    polygone = models.JSONField(null=True, blank=True)
     
     def __str__(self):
         return self.nom
@@ -68,11 +142,17 @@ class Station(models.Model):
     horaires = models.CharField(max_length=200, blank=True)
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    geo_cell = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
     logo = models.ImageField(upload_to='stations/logos/', null=True, blank=True)
+    # Déclinaisons redimensionnées du logo (api.images)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
     date_creation = models.DateTimeField(auto_now_add=True)
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **with_geo_cell(self, kwargs))
+    
     def __str__(self):
         return self.nom
     
@@ -85,11 +165,16 @@ class Livreur(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='livreur_profile')
     vehicule = models.CharField(max_length=100)
     immatriculation = models.CharField(max_length=20)
+    # Nombre de bouteilles transportables en une tournée (api.routing)
+    capacite = models.PositiveSmallIntegerField(default=6)
     zone = models.ForeignKey(Zone, on_delete=models.SET_NULL, null=True, blank=True)
     is_disponible = models.BooleanField(default=True)
     is_approved = models.BooleanField(default=False)
     note_moyenne = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     nombre_livraisons = models.IntegerField(default=0)
+    # Compteurs de la moyenne glissante, mis à jour par api.livreur_stats
+    nombre_evaluations = models.IntegerField(default=0)
+    somme_notes = models.IntegerField(default=0)
     date_creation = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -98,6 +183,10 @@ class Livreur(models.Model):
     class Meta:
         verbose_name = 'Livreur'
         verbose_name_plural = 'Livreurs'
+        indexes = [
+            # LivreurViewSet.disponibles, DispatchEngine
+            models.Index(fields=['is_approved', 'is_disponible'], name='livreur_dispo_idx'),
+        ]
 
 
 class Bouteille(models.Model):
@@ -116,6 +205,8 @@ class Bouteille(models.Model):
     stock = models.IntegerField(default=0)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='bouteilles/', null=True, blank=True)
+    # Déclinaisons redimensionnées de l'image (api.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     code_produit = models.CharField(max_length=50, blank=True, null=True)
     disponible = models.BooleanField(default=True)
     date_creation = models.DateTimeField(auto_now_add=True)
@@ -126,9 +217,31 @@ class Bouteille(models.Model):
     class Meta:
         verbose_name = 'Bouteille'
         verbose_name_plural = 'Bouteilles'
+        indexes = [
+            # Catalogue : BouteilleViewSet (station approuvée, disponible, ?type=)
+            models.Index(fields=['station', 'disponible', 'type'], name='bouteille_catalogue_idx'),
+        ]
 
 
-class Commande(models.Model):
+class Tournee(models.Model):
+    """Tournée multi-arrêts d'un livreur au départ d'une station (api.routing)."""
+    livreur = models.ForeignKey(Livreur, on_delete=models.CASCADE, related_name='tournees')
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='tournees')
+    distance_km = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Tournée #{self.id} - {self.livreur}"
+    
+    class Meta:
+        verbose_name = 'Tournée'
+        verbose_name_plural = 'Tournées'
+        indexes = [
+            models.Index(fields=['livreur', '-date_creation'], name='tournee_livreur_date_idx'),
+        ]
+
+
+class Commande(FieldTrackerMixin, models.Model):
     STATUT_CHOICES = [
         ('en_attente', 'En attente'),
         ('assignee', 'Assignée'),
@@ -141,6 +254,9 @@ class Commande(models.Model):
     bouteille = models.ForeignKey(Bouteille, on_delete=models.CASCADE)
     station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='commandes')
     livreur = models.ForeignKey(Livreur, on_delete=models.SET_NULL, null=True, blank=True, related_name='livraisons')
+    zone = models.ForeignKey(Zone, on_delete=models.SET_NULL, null=True, blank=True, related_name='commandes')
+    tournee = models.ForeignKey(Tournee, on_delete=models.SET_NULL, null=True, blank=True, related_name='commandes')
+    ordre_tournee = models.PositiveSmallIntegerField(null=True, blank=True)
     quantite = models.IntegerField(default=1)
     prix_total = models.DecimalField(max_digits=10, decimal_places=2)
     frais_livraison = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -152,10 +268,22 @@ class Commande(models.Model):
     notes = models.TextField(blank=True, null=True)
     date_commande = models.DateTimeField(auto_now_add=True)
     date_livraison = models.DateTimeField(null=True, blank=True)
+    # Synchronisation incrémentale de la boîte de réception station (api.inbox)
+    date_modification = models.DateTimeField(auto_now=True)
+    
+    # Entrées du prix, puis clé des rollups (api.stats) : l'état chargé sert
+    # à mettre à jour les statistiques de façon incrémentale
+    PRIX_FIELDS = ('bouteille', 'quantite', 'frais_livraison')
+    tracked_fields = PRIX_FIELDS + ('id', 'station', 'statut', 'date_commande', 'montant_total')
     
     def save(self, *args, **kwargs):
-        self.prix_total = self.bouteille.prix * self.quantite
-        self.montant_total = self.prix_total + self.frais_livraison
+        # Le prix n'est recalculé (et la bouteille relue) que si ses entrées ont changé
+        if self._state.adding or any(self.has_changed(name) for name in self.PRIX_FIELDS):
+            self.prix_total = self.bouteille.prix * self.quantite
+            self.montant_total = self.prix_total + self.frais_livraison
+            add_update_fields(kwargs, 'prix_total', 'montant_total')
+        # auto_now n'est appliqué qu'aux champs de update_fields
+        add_update_fields(kwargs, 'date_modification')
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -165,6 +293,17 @@ class Commande(models.Model):
         verbose_name = 'Commande'
         verbose_name_plural = 'Commandes'
         ordering = ['-date_commande']
+        indexes = [
+            # Pagination par curseur (api.pagination.CommandePagination)
+            models.Index(fields=['-date_commande', '-id'], name='commande_date_id_idx'),
+            # Listes par rôle dans CommandeViewSet.get_queryset
+            models.Index(fields=['client', '-date_commande', '-id'], name='commande_client_date_idx'),
+            models.Index(fields=['station', 'statut'], name='commande_station_statut_idx'),
+            models.Index(fields=['livreur', 'statut'], name='commande_livreur_statut_idx'),
+            # Boîte de réception station : pagination par curseur et `?since=`
+            models.Index(fields=['station', '-date_commande', '-id'], name='commande_station_date_idx'),
+            models.Index(fields=['station', 'date_modification'], name='commande_station_modif_idx'),
+        ]
 
 
 class Paiement(models.Model):
@@ -194,3 +333,69 @@ class Paiement(models.Model):
     class Meta:
         verbose_name = 'Paiement'
         verbose_name_plural = 'Paiements'
+        indexes = [
+            models.Index(fields=['-date_paiement', '-id'], name='paiement_date_id_idx'),
+        ]
+
+
+class Evaluation(models.Model):
+    NOTE_CHOICES = [(i, str(i)) for i in range(1, 6)]
+    
+    commande = models.OneToOneField(Commande, on_delete=models.CASCADE, related_name='evaluation')
+    livreur = models.ForeignKey(Livreur, on_delete=models.CASCADE, related_name='evaluations')
+    note = models.PositiveSmallIntegerField(choices=NOTE_CHOICES)
+    commentaire = models.TextField(blank=True, null=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Commande #{self.commande_id} - {self.note}/5"
+    
+    class Meta:
+        verbose_name = 'Évaluation'
+        verbose_name_plural = 'Évaluations'
+        indexes = [
+            models.Index(fields=['livreur', '-date_creation'], name='evaluation_livreur_date_idx'),
+        ]
+
+
+class PositionLivreur(models.Model):
+    # Journal en ajout seul des positions GPS, écrit par lots (api.tracking)
+    livreur = models.ForeignKey(Livreur, on_delete=models.CASCADE, related_name='positions', db_index=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    horodatage = models.DateTimeField()
+    precision = models.FloatField(null=True, blank=True)
+    vitesse = models.FloatField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.livreur_id} @ {self.horodatage}"
+    
+    class Meta:
+        verbose_name = 'Position livreur'
+        verbose_name_plural = 'Positions livreurs'
+        indexes = [
+            models.Index(fields=['livreur', '-horodatage'], name='position_livreur_date_idx'),
+            models.Index(fields=['horodatage'], name='position_date_idx'),
+        ]
+
+
+class StatistiqueJournaliere(models.Model):
+    # Agrégats journaliers par station et statut, maintenus par api.stats
+    jour = models.DateField()
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='statistiques')
+    statut = models.CharField(max_length=20, choices=Commande.STATUT_CHOICES)
+    nombre_commandes = models.IntegerField(default=0)
+    montant_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.jour} - {self.station_id} - {self.statut}"
+    
+    class Meta:
+        verbose_name = 'Statistique journalière'
+        verbose_name_plural = 'Statistiques journalières'
+        constraints = [
+            models.UniqueConstraint(fields=['jour', 'station', 'statut'], name='unique_statistique_jour'),
+        ]
+        indexes = [
+            models.Index(fields=['jour', 'statut'], name='stat_jour_statut_idx'),
+        ]
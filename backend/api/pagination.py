@@ -0,0 +1,233 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def count_requested(request):
+    # `?count=false` évite le SELECT COUNT(*) sur les listes volumineuses
+    return request.query_params.get('count', 'true').lower() not in ('false', '0', 'no')
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """Pagination par numéro de page ; sans total si `?count=false`."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.countless = not count_requested(request)
+        if not self.countless:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        offset = self.countless_offset(request, page_size)
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        return self.countless_page(list(queryset[offset:offset + page_size + 1]), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Même pagination avec l'ORM asynchrone (api.async_views)
+        self.countless = not count_requested(request)
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        if self.countless:
+            offset = self.countless_offset(request, page_size)
+            return self.countless_page([obj async for obj in queryset[offset:offset + page_size + 1]], page_size)
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def countless_offset(self, request, page_size):
+        try:
+            self.number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound('Page invalide.')
+        if self.number < 1:
+            raise NotFound('Page invalide.')
+        return (self.number - 1) * page_size
+
+    def countless_page(self, rows, page_size):
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.countless:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.countless:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if not self.countless:
+            return super().get_previous_link()
+        if self.number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.number - 1)
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Pagination par curseur sur un couple (champ, id) : chaque page est lue via
+    `WHERE champ < valeur OR (champ = valeur AND id < id_curseur)` sans
+    OFFSET. Le total est renvoyé sauf avec `?count=false`.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    # (champ de tri, départage par clé primaire) ; préfixe '-' pour l'ordre décroissant
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = queryset.count() if count_requested(request) else None
+        queryset, cursor = self.page_queryset(queryset, request)
+        return self.set_page(list(queryset[:self.page_size + 1]), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Même pagination avec l'ORM asynchrone (api.async_views)
+        self.request = request
+        self.count = await queryset.acount() if count_requested(request) else None
+        queryset, cursor = self.page_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset[:self.page_size + 1]], cursor)
+
+    def page_queryset(self, queryset, request):
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.get('r'))
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.position_filter(queryset.model, ordering, cursor['p']))
+        return queryset, cursor
+
+    def set_page(self, rows, cursor):
+        reverse = bool(cursor and cursor.get('r'))
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = rows
+        return rows
+
+    def reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def position_filter(self, model, ordering, position):
+        # (a, b) après (x, y) selon l'ordre : a > x OU (a = x ET b > y), appliqué de proche en proche
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Curseur invalide.')
+            if value is None:
+                raise NotFound('Curseur invalide.')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def position(self, obj):
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if len(cursor['p']) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Curseur invalide.')
+        return cursor
+
+    def encode_cursor(self, obj, reverse=False):
+        cursor = {'p': self.position(obj)}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CommandePagination(KeysetPagination):
+    ordering = ('-date_commande', '-id')
+
+
+class PaiementPagination(KeysetPagination):
+    ordering = ('-date_paiement', '-id')
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = '/ws/events/'
+
+
+class Broker:
+    """
+    Interface de diffusion des événements. `publish` peut être appelé depuis
+    n'importe quel thread (vues synchrones) ; `subscribe` et `unsubscribe`
+    depuis la boucle asyncio qui sert la websocket.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class Subscription:
+    MAX_PENDING = 100
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.MAX_PENDING)
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client trop lent : on abandonne l'événement plutôt que de bloquer l'émetteur
+            logger.warning('Événement abandonné pour %s (file pleine)', self.channels)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+    """
+    Pub/sub en mémoire : un événement n'atteint que les websockets du
+    processus qui l'a publié. Ne convient qu'à un déploiement ASGI à un seul
+    processus servant à la fois l'API et /ws/events/.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscribers[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'REALTIME_BROKER', 'api.realtime.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def channels_for(user):
+    channels = [f'user:{user.pk}', f'role:{user.role}']
+    if user.role == 'station':
+        try:
+            channels.append(f'station:{user.station_profile.pk}')
+        except Exception:
+            pass
+    if user.role == 'livreur':
+        try:
+            channels.append(f'livreur:{user.livreur_profile.pk}')
+        except Exception:
+            pass
+    return channels
+
+
+def commande_channels(commande):
+    channels = [f'user:{commande.client_id}', f'station:{commande.station_id}', 'role:admin']
+    if commande.livreur_id:
+        channels.append(f'livreur:{commande.livreur_id}')
+    return channels
+
+
+def commande_message(commande, event):
+    return {
+        'type': event,
+        'commande': {
+            'id': commande.pk,
+            'statut': commande.statut,
+            'station': commande.station_id,
+            'livreur': commande.livreur_id,
+            'date_livraison': commande.date_livraison.isoformat() if commande.date_livraison else None,
+        },
+        'date': timezone.now().isoformat(),
+    }
+
+
+def publish_commande_event(commande, event):
+    """Diffuse l'événement aux abonnés concernés une fois la transaction validée."""
+    message = commande_message(commande, event)
+    channels = commande_channels(commande)
+
+    def publish():
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, message)
+
+    transaction.on_commit(publish)
+
+
+def authenticate_token(raw_token):
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+    from .authentication import CachedJWTAuthentication
+
+    close_old_connections()
+    try:
+        backend = CachedJWTAuthentication()
+        user = backend.get_user(backend.get_validated_token(raw_token.encode()))
+        return user, channels_for(user)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    finally:
+        close_old_connections()
+
+
+async def websocket_application(scope, receive, send):
+    """
+    Application ASGI websocket : `ws://.../ws/events/?token=<access JWT>`.
+    Le client reçoit en JSON les événements de commande de ses canaux
+    (utilisateur, rôle, station ou livreur).
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    if scope.get('path') != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    user, channels = (None, None)
+    if token:
+        user, channels = await sync_to_async(authenticate_token, thread_sensitive=False)(token)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe(channels)
+
+    async def forward():
+        while True:
+            message = await subscription.get()
+            await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def listen():
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event['type'] == 'websocket.receive' and event.get('text') == 'ping':
+                await send({'type': 'websocket.send', 'text': 'pong'})
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(listen())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
@@ -0,0 +1,250 @@
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, When, Value
+from django.utils import timezone
+
+from .dispatch import DispatchEngine, get_setting
+from .geo import KM_PER_DEGREE_LAT
+from .models import Commande, Tournee
+from .realtime import publish_commande_event
+from .stats import record_status_change
+
+
+class Stop:
+    """
+    Arrêt d'une tournée, projeté en km autour de la station (projection
+    équirectangulaire, précise à l'échelle d'une ville) : les distances se
+    calculent avec math.hypot au lieu de la formule de haversine.
+    """
+    __slots__ = ('commande', 'x', 'y', 'quantite')
+
+    def __init__(self, commande, x, y, quantite):
+        self.commande = commande
+        self.x = x
+        self.y = y
+        self.quantite = quantite
+
+    @classmethod
+    def project(cls, commande, origin_lat, origin_lng):
+        cos_lat = math.cos(math.radians(origin_lat))
+        x = (float(commande.longitude_livraison) - origin_lng) * KM_PER_DEGREE_LAT * cos_lat
+        y = (float(commande.latitude_livraison) - origin_lat) * KM_PER_DEGREE_LAT
+        return cls(commande, x, y, commande.quantite)
+
+
+ORIGIN = Stop(None, 0.0, 0.0, 0)
+
+
+def distance(a, b):
+    return math.hypot(a.x - b.x, a.y - b.y)
+
+
+def tour_length(tour):
+    """Longueur (km) du trajet station -> arrêts, sans retour à la station."""
+    total, previous = 0.0, ORIGIN
+    for stop in tour:
+        total += distance(previous, stop)
+        previous = stop
+    return total
+
+
+def nearest_neighbour_tours(stops, capacity, max_leg_km):
+    """
+    Découpe les arrêts d'une station en tournées : depuis la station, le
+    livreur va toujours à l'arrêt restant le plus proche qui tient dans la
+    capacité, tant qu'il est à moins de `max_leg_km` de l'arrêt précédent.
+    Chaque arrêt doit tenir seul dans `capacity`.
+    """
+    remaining = list(stops)
+    tours = []
+    while remaining:
+        tour, load, position = [], 0, ORIGIN
+        while True:
+            best, best_km = None, None
+            for i, stop in enumerate(remaining):
+                if load + stop.quantite > capacity:
+                    continue
+                km = distance(position, stop)
+                if tour and km > max_leg_km:
+                    continue
+                if best_km is None or km < best_km:
+                    best, best_km = i, km
+            if best is None:
+                break
+            stop = remaining.pop(best)
+            tour.append(stop)
+            load += stop.quantite
+            position = stop
+        tours.append(tour)
+    return tours
+
+
+def two_opt(tour):
+    """Améliore la tournée en place en inversant des segments tant que le trajet raccourcit."""
+    points = [ORIGIN] + tour
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(points) - 1):
+            for j in range(i + 1, len(points)):
+                # Arêtes (i-1, i) et (j, j+1) remplacées par (i-1, j) et (i, j+1) ;
+                # pas d'arête après le dernier arrêt (trajet ouvert)
+                delta = distance(points[i - 1], points[j]) - distance(points[i - 1], points[i])
+                if j + 1 < len(points):
+                    delta += distance(points[i], points[j + 1]) - distance(points[j], points[j + 1])
+                if delta < -1e-9:
+                    points[i:j + 1] = reversed(points[i:j + 1])
+                    improved = True
+    tour[:] = points[1:]
+    return tour
+
+
+class TourneePlanner(DispatchEngine):
+    """
+    Variante du dispatch qui regroupe les commandes en attente d'une même
+    station en tournées multi-arrêts (plus proche voisin puis 2-opt, dans la
+    limite de la capacité du véhicule) et confie chaque tournée à un livreur
+    libre. Les commandes isolées suivent le dispatch unitaire.
+    """
+
+    def __init__(self, max_leg_km=None, min_stops=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_leg_km = max_leg_km or get_setting('ROUTING_MAX_LEG_KM', 3)
+        self.min_stops = min_stops or get_setting('ROUTING_MIN_STOPS', 2)
+
+    def build_tours(self, commandes, capacity):
+        """Renvoie (tournées, commandes laissées au dispatch unitaire)."""
+        by_station = defaultdict(list)
+        singles = []
+        for commande in commandes:
+            station = commande.station
+            if (
+                station.latitude is None or station.longitude is None
+                or commande.latitude_livraison is None or commande.longitude_livraison is None
+                or commande.quantite > capacity
+            ):
+                singles.append(commande)
+            else:
+                by_station[commande.station_id].append(commande)
+
+        tours = []
+        for station_commandes in by_station.values():
+            station = station_commandes[0].station
+            origin = (float(station.latitude), float(station.longitude))
+            stops = [Stop.project(commande, *origin) for commande in station_commandes]
+            for tour in nearest_neighbour_tours(stops, capacity, self.max_leg_km):
+                if len(tour) < self.min_stops:
+                    singles.extend(stop.commande for stop in tour)
+                else:
+                    tours.append(two_opt(tour))
+        return tours, singles
+
+    def best_tour_candidate(self, tour):
+        # Un livreur libre (sans livraison en cours) dont le véhicule porte toute la tournée
+        load = sum(stop.quantite for stop in tour)
+        first = tour[0].commande
+        pool = [
+            (candidate, pickup_km) for candidate, pickup_km in self.candidate_pool(first.station)
+            if candidate.charge == 0 and candidate.livreur.capacite >= load
+        ]
+        return self.best_of(first, pool, tour_length(tour))
+
+    def plan_tours(self, tours):
+        assignments, unassigned = [], []
+        for tour in tours:
+            candidate = self.best_tour_candidate(tour)
+            if candidate is None:
+                unassigned.extend(stop.commande for stop in tour)
+                continue
+            candidate.charge += len(tour)
+            assignments.append((tour, candidate.livreur))
+        return assignments, unassigned
+
+    def apply_tours(self, assignments):
+        if not assignments:
+            return []
+        assigned = []
+        with transaction.atomic():
+            tournees = Tournee.objects.bulk_create([
+                Tournee(
+                    livreur=livreur,
+                    station_id=tour[0].commande.station_id,
+                    distance_km=Decimal(f'{tour_length(tour):.2f}'),
+                )
+                for tour, livreur in assignments
+            ])
+            rows = [
+                (stop, livreur, tournee, ordre)
+                for (tour, livreur), tournee in zip(assignments, tournees)
+                for ordre, stop in enumerate(tour, start=1)
+            ]
+            now = timezone.now()
+            won_stops = defaultdict(list)
+            for start in range(0, len(rows), self.UPDATE_CHUNK_SIZE):
+                chunk = rows[start:start + self.UPDATE_CHUNK_SIZE]
+                ids = [stop.commande.pk for stop, _, _, _ in chunk]
+                Commande.objects.filter(
+                    pk__in=ids, statut='en_attente', livreur__isnull=True
+                ).update(
+                    livreur_id=Case(*[When(pk=s.commande.pk, then=Value(livreur.pk)) for s, livreur, _, _ in chunk]),
+                    tournee_id=Case(*[When(pk=s.commande.pk, then=Value(tournee.pk)) for s, _, tournee, _ in chunk]),
+                    ordre_tournee=Case(*[When(pk=s.commande.pk, then=Value(ordre)) for s, _, _, ordre in chunk]),
+                    statut='assignee',
+                    date_modification=now,
+                )
+                # Ne retenir que les commandes effectivement affectées par ce passage
+                won = set(
+                    Commande.objects.filter(pk__in=ids, statut='assignee')
+                    .values_list('pk', 'tournee_id')
+                )
+                for stop, livreur, tournee, ordre in chunk:
+                    commande = stop.commande
+                    if (commande.pk, tournee.pk) in won:
+                        commande.livreur = livreur
+                        commande.tournee = tournee
+                        commande.ordre_tournee = ordre
+                        commande.statut = 'assignee'
+                        assigned.append(commande)
+                        won_stops[tournee.pk].append(stop)
+            self.close_gaps(assignments, tournees, won_stops)
+            # Tournées dont toutes les commandes ont été prises entre-temps
+            Tournee.objects.filter(pk__in=[t.pk for t in tournees], commandes__isnull=True).delete()
+            record_status_change(assigned, 'en_attente')
+            for commande in assigned:
+                publish_commande_event(commande, 'commande.assignee')
+        return assigned
+
+    def close_gaps(self, assignments, tournees, won_stops):
+        """
+        Tournées dont une partie des arrêts a été prise entre-temps : les arrêts
+        restants sont renumérotés sans trou, dans l'ordre prévu, et la distance
+        est recalculée sur ce trajet raccourci.
+        """
+        ordres = {}
+        for (tour, _), tournee in zip(assignments, tournees):
+            stops = won_stops.get(tournee.pk)
+            if not stops or len(stops) == len(tour):
+                continue
+            for ordre, stop in enumerate(stops, start=1):
+                stop.commande.ordre_tournee = ordres[stop.commande.pk] = ordre
+            tournee.distance_km = Decimal(f'{tour_length(stops):.2f}')
+            Tournee.objects.filter(pk=tournee.pk).update(distance_km=tournee.distance_km)
+        pks = list(ordres)
+        for start in range(0, len(pks), self.UPDATE_CHUNK_SIZE):
+            chunk = pks[start:start + self.UPDATE_CHUNK_SIZE]
+            Commande.objects.filter(pk__in=chunk).update(
+                ordre_tournee=Case(*[When(pk=pk, then=Value(ordres[pk])) for pk in chunk])
+            )
+
+    def dispatch(self, commandes):
+        if not commandes:
+            return []
+        self.load_candidates()
+        capacity = max((c.livreur.capacite for c in self.candidates if c.charge == 0), default=0)
+        tours, singles = self.build_tours(commandes, capacity)
+        assignments, unassigned = self.plan_tours(tours)
+        assigned = self.apply_tours(assignments)
+        return assigned + self.apply(self.plan(singles + unassigned))
@@ -1,9 +1,102 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Station, Livreur, Zone, Bouteille, Commande, Paiement
+from django.db import transaction
+from .models import User, Station, Livreur, Zone, Bouteille, Commande, Tournee, Paiement, Evaluation
+from . import bulk, images, stock, zones
 
 
-class UserSerializer(serializers.ModelSerializer):
+def split_param(value):
+    return {item.strip() for item in (value or '').split(',') if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Champs clairsemés pour les réponses en lecture :
+    - `?fields=id,statut` ne renvoie que les champs demandés ;
+    - les relations de `expandable_fields` sont compactes (id + libellé) sur les
+      actions de liste de la vue (`compact_actions`, par défaut 'list') et
+      complètes ailleurs ; `?expand=client,livreur` (ou `?expand=*`) force
+      leur développement.
+    Un nom inconnu dans l'un ou l'autre paramètre donne une erreur 400.
+    """
+    # nom du champ -> serializer compact utilisé à la place du serializer complet
+    expandable_fields = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        
+        expand = split_param(request.query_params.get('expand'))
+        unknown = expand - set(self.expandable_fields) - {'*', 'all'}
+        if unknown:
+            raise serializers.ValidationError({'expand': f"Relations inconnues : {', '.join(sorted(unknown))}."})
+        view = self.context.get('view')
+        compact = getattr(view, 'action', None) in getattr(view, 'compact_actions', ('list',))
+        if compact and not expand & {'*', 'all'}:
+            for name, compact_class in self.expandable_fields.items():
+                if name in self.fields and name not in expand:
+                    source = self.fields[name].source
+                    kwargs = {'source': source} if source != name else {}
+                    self.fields[name] = compact_class(read_only=True, **kwargs)
+        
+        requested = split_param(request.query_params.get('fields'))
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Champs inconnus : {', '.join(sorted(unknown))}."})
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+class UpdateFieldsMixin:
+    """
+    update() n'écrit que les colonnes reçues (save(update_fields=...)) : les
+    autres colonnes, modifiées entre-temps par une autre requête ou par un
+    incrément F(), ne sont pas réécrites avec la valeur lue.
+    """
+    
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class UserCompactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'nom', 'prenom']
+
+
+class ZoneCompactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Zone
+        fields = ['id', 'nom']
+
+
+class StationCompactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Station
+        fields = ['id', 'nom']
+
+
+class LivreurCompactSerializer(serializers.ModelSerializer):
+    nom = serializers.CharField(source='__str__', read_only=True)
+    
+    class Meta:
+        model = Livreur
+        fields = ['id', 'nom']
+
+
+class BouteilleCompactSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Bouteille
+        fields = ['id', 'nom_commercial', 'type']
+
+
+class UserSerializer(DynamicFieldsMixin, UpdateFieldsMixin, serializers.ModelSerializer):
     coordonnees_gps = serializers.SerializerMethodField()
     
     class Meta:
@@ -96,20 +189,60 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class ZoneSerializer(serializers.ModelSerializer):
+class ZoneSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Zone
-        fields = ['id', 'nom', 'frais_livraison', 'delai_estime', 'is_active']
+        fields = ['id', 'nom', 'frais_livraison', 'delai_estime', 'is_active',
+                  'centre_latitude', 'centre_longitude', 'rayon_km', 'polygone']
+    
+    def validate_polygone(self, value):
+        if value in (None, []):
+            return None
+        try:
+            points = [(float(lat), float(lng)) for lat, lng in value]
+        except (TypeError, ValueError):
+            raise serializers.ValidationError('Le polygone doit être une liste de points [latitude, longitude].')
+        if len(points) < 3:
+            raise serializers.ValidationError('Le polygone doit comporter au moins 3 points.')
+        if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in points):
+            raise serializers.ValidationError('Coordonnées hors limites.')
+        return [list(point) for point in points]
+    
+    def validate(self, attrs):
+        centre = [attrs.get(name, getattr(self.instance, name, None))
+                  for name in ('centre_latitude', 'centre_longitude', 'rayon_km')]
+        if any(value is not None for value in centre) and None in centre:
+            raise serializers.ValidationError(
+                {'rayon_km': 'Le centre (latitude, longitude) et le rayon doivent être renseignés ensemble.'}
+            )
+        return attrs
 
 
-class StationSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs des déclinaisons miniature / détail (WebP et JPEG) ; {} tant qu'elles ne sont pas générées."""
+    
+    def to_representation(self, value):
+        return images.variant_urls(value or {}, self.context.get('request'))
+
+
+class DistanceMixin(serializers.Serializer):
+    # Renseigné uniquement en mode recherche `?near=` (voir api.geo.filter_near)
+    distance_km = serializers.SerializerMethodField()
+    
+    def get_distance_km(self, obj):
+        return getattr(obj, 'distance_km', None)
+
+
+class StationSerializer(DynamicFieldsMixin, DistanceMixin, serializers.ModelSerializer):
     email = serializers.EmailField(source='user.email', read_only=True)
     coordonnees_gps = serializers.SerializerMethodField()
+    logo_variants = ImageVariantsField()
     
     class Meta:
         model = Station
         fields = ['id', 'nom', 'adresse', 'telephone', 'email', 
-                  'coordonnees_gps', 'horaires', 'is_active', 'is_approved', 'logo']
+                  'coordonnees_gps', 'horaires', 'is_active', 'is_approved', 'logo', 'logo_variants',
+                  'distance_km']
         read_only_fields = ['id', 'is_approved']
     
     def get_coordonnees_gps(self, obj):
@@ -118,26 +251,32 @@ class StationSerializer(serializers.ModelSerializer):
         return None
 
 
-class LivreurSerializer(serializers.ModelSerializer):
+class LivreurSerializer(DynamicFieldsMixin, UpdateFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     zone = ZoneSerializer(read_only=True)
+    expandable_fields = {
+        'user': UserCompactSerializer,
+        'zone': ZoneCompactSerializer,
+    }
     
     class Meta:
         model = Livreur
-        fields = ['id', 'user', 'vehicule', 'immatriculation', 'zone', 
-                  'is_disponible', 'is_approved', 'note_moyenne', 'nombre_livraisons']
-        read_only_fields = ['id', 'is_approved', 'note_moyenne', 'nombre_livraisons']
+        fields = ['id', 'user', 'vehicule', 'immatriculation', 'capacite', 'zone', 
+                  'is_disponible', 'is_approved', 'note_moyenne', 'nombre_evaluations', 'nombre_livraisons']
+        # Compteurs incrémentés en base par api.livreur_stats : jamais réécrits par une mise à jour du profil
+        read_only_fields = ['id', 'is_approved', 'note_moyenne', 'nombre_evaluations', 'nombre_livraisons']
 
 
-class BouteilleSerializer(serializers.ModelSerializer):
+class BouteilleSerializer(DynamicFieldsMixin, DistanceMixin, serializers.ModelSerializer):
     station_nom = serializers.CharField(source='station.nom', read_only=True)
     station_coordonnees = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Bouteille
         fields = ['id', 'nom_commercial', 'type', 'marque', 'prix', 'stock',
-                  'description', 'image', 'code_produit', 'station', 
-                  'station_nom', 'station_coordonnees', 'disponible']
+                  'description', 'image', 'image_variants', 'code_produit', 'station', 
+                  'station_nom', 'station_coordonnees', 'disponible', 'distance_km']
         read_only_fields = ['id', 'station_nom', 'station_coordonnees']
     
     def get_station_coordonnees(self, obj):
@@ -146,19 +285,26 @@ class BouteilleSerializer(serializers.ModelSerializer):
         return None
 
 
-class CommandeSerializer(serializers.ModelSerializer):
+class CommandeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     client = UserSerializer(read_only=True)
     bouteille = BouteilleSerializer(read_only=True)
     station = StationSerializer(read_only=True)
     livreur = LivreurSerializer(read_only=True)
     coordonnees_livraison = serializers.SerializerMethodField()
+    expandable_fields = {
+        'client': UserCompactSerializer,
+        'bouteille': BouteilleCompactSerializer,
+        'station': StationCompactSerializer,
+        'livreur': LivreurCompactSerializer,
+    }
     
     class Meta:
         model = Commande
         fields = ['id', 'client', 'bouteille', 'station', 'livreur', 'quantite',
                   'prix_total', 'frais_livraison', 'montant_total', 'adresse_livraison',
-                  'coordonnees_livraison', 'statut', 'notes', 'date_commande', 'date_livraison']
-        read_only_fields = ['id', 'prix_total', 'montant_total', 'date_commande']
+                  'coordonnees_livraison', 'statut', 'notes', 'date_commande', 'date_livraison',
+                  'date_modification']
+        read_only_fields = ['id', 'prix_total', 'montant_total', 'date_commande', 'date_modification']
     
     def get_coordonnees_livraison(self, obj):
         if obj.latitude_livraison and obj.longitude_livraison:
@@ -166,6 +312,27 @@ class CommandeSerializer(serializers.ModelSerializer):
         return None
 
 
+class CommandeInboxFilterSerializer(serializers.Serializer):
+    """Paramètres de la boîte de réception station (`?statut=en_attente,assignee&since=...`)."""
+    statut = serializers.CharField(required=False)
+    date_debut = serializers.DateField(required=False)
+    date_fin = serializers.DateField(required=False)
+    livreur = serializers.IntegerField(required=False)
+    since = serializers.DateTimeField(required=False)
+    
+    def validate_statut(self, value):
+        statuts = split_param(value)
+        invalides = statuts - set(dict(Commande.STATUT_CHOICES))
+        if invalides:
+            raise serializers.ValidationError(f"Statut invalide : {', '.join(sorted(invalides))}.")
+        return statuts
+    
+    def validate(self, attrs):
+        if attrs.get('date_debut') and attrs.get('date_fin') and attrs['date_debut'] > attrs['date_fin']:
+            raise serializers.ValidationError({'date_fin': 'La date de fin précède la date de début.'})
+        return attrs
+
+
 class CommandeCreateSerializer(serializers.ModelSerializer):
     bouteille_id = serializers.IntegerField(write_only=True)
     latitude = serializers.DecimalField(max_digits=10, decimal_places=8, required=False)
@@ -175,35 +342,148 @@ class CommandeCreateSerializer(serializers.ModelSerializer):
         model = Commande
         fields = ['bouteille_id', 'quantite', 'adresse_livraison', 'latitude', 'longitude', 'notes']
     
+    def validate_quantite(self, value):
+        if value < 1:
+            raise serializers.ValidationError('La quantité doit être au moins 1.')
+        return value
+    
+    def validate_bouteille_id(self, value):
+        try:
+            self._bouteille = Bouteille.objects.select_related('station').get(id=value, disponible=True)
+        except Bouteille.DoesNotExist:
+            raise serializers.ValidationError('Bouteille introuvable ou indisponible.')
+        return value
+    
     def create(self, validated_data):
-        bouteille_id = validated_data.pop('bouteille_id')
+        validated_data.pop('bouteille_id')
         latitude = validated_data.pop('latitude', None)
         longitude = validated_data.pop('longitude', None)
         
-        bouteille = Bouteille.objects.get(id=bouteille_id)
+        bouteille = self._bouteille
+        quantite = validated_data.get('quantite', 1)
         
-        zone = Zone.objects.filter(is_active=True).first()
+        # Zone résolue en mémoire depuis les coordonnées de livraison (api.zones)
+        zone = zones.resolve(latitude, longitude)
         frais_livraison = zone.frais_livraison if zone else 0
         
-        commande = Commande.objects.create(
-            client=self.context['request'].user,
-            bouteille=bouteille,
-            station=bouteille.station,
-            frais_livraison=frais_livraison,
-            latitude_livraison=latitude,
-            longitude_livraison=longitude,
-            **validated_data
-        )
+        with transaction.atomic():
+            if not stock.reserve(bouteille.pk, quantite):
+                raise serializers.ValidationError({'quantite': 'Stock insuffisant.'})
+            commande = Commande.objects.create(
+                client=self.context['request'].user,
+                bouteille=bouteille,
+                station=bouteille.station,
+                zone=zone,
+                frais_livraison=frais_livraison,
+                latitude_livraison=latitude,
+                longitude_livraison=longitude,
+                **validated_data
+            )
         return commande
 
 
-class PaiementSerializer(serializers.ModelSerializer):
+class CommandeItemSerializer(serializers.Serializer):
+    bouteille_id = serializers.IntegerField()
+    quantite = serializers.IntegerField(default=1)
+    adresse_livraison = serializers.CharField()
+    latitude = serializers.DecimalField(max_digits=10, decimal_places=8, required=False)
+    longitude = serializers.DecimalField(max_digits=11, decimal_places=8, required=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    
+    def validate_quantite(self, value):
+        if value < 1:
+            raise serializers.ValidationError('La quantité doit être au moins 1.')
+        return value
+
+
+class CommandeBulkCreateSerializer(serializers.Serializer):
+    commandes = CommandeItemSerializer(many=True, allow_empty=False, max_length=200)
+    
+    def validate_commandes(self, items):
+        # Toutes les bouteilles du lot en une requête, erreurs rapportées par élément
+        ids = {item['bouteille_id'] for item in items}
+        self._bouteilles = Bouteille.objects.select_related('station__user').filter(disponible=True).in_bulk(ids)
+        errors = bulk.item_errors(
+            items, lambda item: item['bouteille_id'] not in self._bouteilles,
+            'bouteille_id', 'Bouteille introuvable ou indisponible.'
+        )
+        if any(errors['commandes']):
+            raise serializers.ValidationError(errors['commandes'])
+        return items
+    
+    def create(self, validated_data):
+        return bulk.create_commandes(self.context['request'].user, validated_data['commandes'], self._bouteilles)
+
+
+class CommandeStatutItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    statut = serializers.ChoiceField(choices=Commande.STATUT_CHOICES)
+
+
+class CommandeBulkStatutSerializer(serializers.Serializer):
+    commandes = CommandeStatutItemSerializer(many=True, allow_empty=False, max_length=200)
+    
+    def validate_commandes(self, items):
+        seen = set()
+        errors = []
+        for item in items:
+            errors.append({'id': ['Commande en double dans le lot.']} if item['id'] in seen else {})
+            seen.add(item['id'])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+
+class TourneeArretSerializer(serializers.ModelSerializer):
+    client = UserCompactSerializer(read_only=True)
+    ordre = serializers.IntegerField(source='ordre_tournee', read_only=True)
+    coordonnees_livraison = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Commande
+        fields = ['ordre', 'id', 'client', 'quantite', 'adresse_livraison', 'coordonnees_livraison', 'statut']
+    
+    def get_coordonnees_livraison(self, obj):
+        if obj.latitude_livraison and obj.longitude_livraison:
+            return {'latitude': float(obj.latitude_livraison), 'longitude': float(obj.longitude_livraison)}
+        return None
+
+
+class TourneeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    station = StationCompactSerializer(read_only=True)
+    arrets = TourneeArretSerializer(source='commandes', many=True, read_only=True)
+    
+    class Meta:
+        model = Tournee
+        fields = ['id', 'station', 'distance_km', 'date_creation', 'arrets']
+
+
+class EvaluationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Evaluation
+        fields = ['id', 'commande', 'livreur', 'note', 'commentaire', 'date_creation']
+        read_only_fields = ['id', 'commande', 'livreur', 'date_creation']
+
+
+class PaiementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Paiement
         fields = ['id', 'commande', 'montant', 'methode', 'statut', 'reference', 'date_paiement']
         read_only_fields = ['id', 'reference', 'date_paiement']
 
 
+class PositionSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    horodatage = serializers.DateTimeField(required=False)
+    precision = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    vitesse = serializers.FloatField(required=False, allow_null=True, min_value=0)
+
+
+class PositionBatchSerializer(serializers.Serializer):
+    points = PositionSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class DashboardStatsSerializer(serializers.Serializer):
     total_clients = serializers.IntegerField()
     total_livreurs = serializers.IntegerField()
@@ -217,3 +497,14 @@ class DashboardStatsSerializer(serializers.Serializer):
 
 class ApprovalSerializer(serializers.Serializer):
     approved = serializers.BooleanField()
+
+
+class BulkApprovalSerializer(ApprovalSerializer):
+    users = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=1000)
+    stations = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    livreurs = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    
+    def validate(self, attrs):
+        if not any(attrs.get(name) for name in ('users', 'stations', 'livreurs')):
+            raise serializers.ValidationError('Aucun utilisateur, station ou livreur sélectionné.')
+        return attrs
@@ -0,0 +1,63 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from gazexpress.database import configure_sqlite
+
+from . import authentication, catalogue, images, metrics, stats, zones
+from .models import User, Station, Livreur, Zone, Bouteille, Commande
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        configure_sqlite(connection)
+    metrics.install(connection)
+
+
+@receiver(post_save, sender=Commande)
+def commande_saved(sender, instance, update_fields=None, **kwargs):
+    stats.record_commande(instance, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=Commande)
+def commande_deleted(sender, instance, **kwargs):
+    stats.record_commande(instance, deleted=True)
+
+
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+def zone_changed(sender, instance, **kwargs):
+    transaction.on_commit(zones.invalidate)
+
+
+@receiver(post_save, sender=Bouteille)
+@receiver(post_delete, sender=Bouteille)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def catalogue_changed(sender, instance, **kwargs):
+    transaction.on_commit(catalogue.invalidate)
+
+
+@receiver(post_save, sender=Bouteille)
+@receiver(post_save, sender=Station)
+def image_saved(sender, instance, **kwargs):
+    images.schedule(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Après le commit : une requête concurrente ne remet pas en cache l'ancienne ligne
+    transaction.on_commit(partial(authentication.invalidate, instance.pk))
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=Livreur)
+@receiver(post_delete, sender=Livreur)
+def profile_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(authentication.invalidate, instance.user_id))
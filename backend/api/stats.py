@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+DASHBOARD_COUNTS_CACHE_KEY = 'dashboard:counts'
+DASHBOARD_COUNTS_TTL = 60
+
+
+def stats_snapshot(commande, fields=None):
+    """
+    Clé de rollup (jour, station, statut) et montant d'une commande, ou None si
+    non enregistrée. `fields` permet de la calculer depuis un autre état que
+    les attributs courants (ex. l'état chargé de Commande.loaded_state()).
+    """
+    fields = commande.__dict__ if fields is None else fields
+    if fields.get('id') is None or fields.get('date_commande') is None:
+        return None
+    return (
+        timezone.localdate(fields['date_commande']),
+        fields.get('station_id'),
+        fields.get('statut'),
+        fields.get('montant_total') or Decimal('0'),
+    )
+
+
+def add_delta(deltas, snapshot, sign):
+    if snapshot is None:
+        return
+    jour, station_id, statut, montant = snapshot
+    delta = deltas[(jour, station_id, statut)]
+    delta[0] += sign
+    delta[1] += sign * Decimal(montant)
+
+
+def apply_deltas(deltas):
+    StatistiqueJournaliere = apps.get_model('api', 'StatistiqueJournaliere')
+    for (jour, station_id, statut), (nombre, montant) in deltas.items():
+        if not nombre and not montant:
+            continue
+        rows = StatistiqueJournaliere.objects.filter(jour=jour, station_id=station_id, statut=statut)
+        increments = {
+            'nombre_commandes': F('nombre_commandes') + nombre,
+            'montant_total': F('montant_total') + montant,
+        }
+        if rows.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                StatistiqueJournaliere.objects.create(
+                    jour=jour, station_id=station_id, statut=statut,
+                    nombre_commandes=nombre, montant_total=montant,
+                )
+        except IntegrityError:
+            # Ligne créée entre-temps par une requête concurrente
+            rows.update(**increments)
+
+
+def saved_state(commande, update_fields):
+    # Avec update_fields, seuls les champs écrits remplacent l'état chargé
+    if update_fields is None:
+        return commande.__dict__
+    state = dict(commande.loaded_state())
+    for attname in commande.tracked_attnames(update_fields):
+        state[attname] = commande.__dict__.get(attname)
+    return state
+
+
+def record_commande(commande, deleted=False, update_fields=None):
+    """
+    Reporte dans les rollups la différence entre l'état chargé et l'état
+    écrit. Appelé depuis post_save / post_delete, avant que Commande.save ne
+    réinitialise l'état chargé.
+    """
+    old = stats_snapshot(commande, commande.loaded_state())
+    new = None if deleted else stats_snapshot(commande, saved_state(commande, update_fields))
+    if old == new:
+        return
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    add_delta(deltas, old, -1)
+    add_delta(deltas, new, +1)
+    apply_deltas(deltas)
+
+
+def record_commandes(commandes):
+    """Rollups de commandes écrites en masse (bulk_create / bulk_update), qui n'émettent pas de signaux."""
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for commande in commandes:
+        old = stats_snapshot(commande, commande.loaded_state())
+        new = stats_snapshot(commande)
+        commande.reset_tracking()
+        if old == new:
+            continue
+        add_delta(deltas, old, -1)
+        add_delta(deltas, new, +1)
+    apply_deltas(deltas)
+
+
+def record_status_change(commandes, old_statut):
+    """Rollups pour des commandes mises à jour en masse via queryset.update()."""
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for commande in commandes:
+        new = stats_snapshot(commande)
+        if new is None:
+            continue
+        add_delta(deltas, (*new[:2], old_statut, new[3]), -1)
+        add_delta(deltas, new, +1)
+        commande.reset_tracking(['statut', 'livreur'])
+    apply_deltas(deltas)
+
+
+def rebuild(app_registry=apps):
+    """Recalcule entièrement les rollups depuis l'historique des commandes."""
+    Commande = app_registry.get_model('api', 'Commande')
+    StatistiqueJournaliere = app_registry.get_model('api', 'StatistiqueJournaliere')
+    rows = (
+        Commande.objects.order_by()
+        .annotate(jour=TruncDate('date_commande'))
+        .values('jour', 'station_id', 'statut')
+        .annotate(nombre=Count('id'), montant=Sum('montant_total'))
+    )
+    with transaction.atomic():
+        StatistiqueJournaliere.objects.all().delete()
+        created = StatistiqueJournaliere.objects.bulk_create(
+            (
+                StatistiqueJournaliere(
+                    jour=row['jour'], station_id=row['station_id'], statut=row['statut'],
+                    nombre_commandes=row['nombre'], montant_total=row['montant'] or 0,
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def entity_querysets():
+    User = apps.get_model('api', 'User')
+    Livreur = apps.get_model('api', 'Livreur')
+    Station = apps.get_model('api', 'Station')
+    return {
+        'total_clients': User.objects.filter(role='client'),
+        'total_livreurs': Livreur.objects.filter(is_approved=True),
+        'total_stations': Station.objects.filter(is_approved=True),
+    }
+
+
+def entity_counts():
+    counts = cache.get(DASHBOARD_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = {key: queryset.count() for key, queryset in entity_querysets().items()}
+        cache.set(DASHBOARD_COUNTS_CACHE_KEY, counts, DASHBOARD_COUNTS_TTL)
+    return counts
+
+
+async def aentity_counts():
+    counts = await cache.aget(DASHBOARD_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = {key: await queryset.acount() for key, queryset in entity_querysets().items()}
+        await cache.aset(DASHBOARD_COUNTS_CACHE_KEY, counts, DASHBOARD_COUNTS_TTL)
+    return counts
+
+
+def dashboard_totals():
+    StatistiqueJournaliere = apps.get_model('api', 'StatistiqueJournaliere')
+    today = timezone.localdate()
+    return StatistiqueJournaliere.objects, dict(
+        total_commandes=Sum('nombre_commandes'),
+        revenus_totaux=Sum('montant_total', filter=Q(statut='livree')),
+        commandes_jour=Sum('nombre_commandes', filter=Q(jour=today)),
+        commandes_semaine=Sum('nombre_commandes', filter=Q(jour__gte=today - timedelta(days=7))),
+        commandes_mois=Sum('nombre_commandes', filter=Q(jour__gte=today - timedelta(days=30))),
+    )
+
+
+def dashboard_stats():
+    queryset, aggregates = dashboard_totals()
+    stats = {key: value or 0 for key, value in queryset.aggregate(**aggregates).items()}
+    stats.update(entity_counts())
+    return stats
+
+
+async def adashboard_stats():
+    # Version ORM asynchrone (api.async_views)
+    queryset, aggregates = dashboard_totals()
+    stats = {key: value or 0 for key, value in (await queryset.aaggregate(**aggregates)).items()}
+    stats.update(await aentity_counts())
+    return stats
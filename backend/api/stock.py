@@ -0,0 +1,19 @@
+from django.db.models import F
+
+from .models import Bouteille
+
+
+def reserve(bouteille_id, quantite):
+    """
+    Décrémente le stock en un seul UPDATE conditionnel
+    (UPDATE ... SET stock = stock - n WHERE stock >= n). Renvoie False si le
+    stock est insuffisant ; aucun verrou applicatif n'est nécessaire.
+    """
+    return bool(
+        Bouteille.objects.filter(pk=bouteille_id, stock__gte=quantite)
+        .update(stock=F('stock') - quantite)
+    )
+
+
+def release(bouteille_id, quantite):
+    Bouteille.objects.filter(pk=bouteille_id).update(stock=F('stock') + quantite)
@@ -0,0 +1,176 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Livreur, PositionLivreur
+
+
+logger = logging.getLogger(__name__)
+
+POSITION_CACHE_KEY = 'livreur:position:{}'
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class PositionBuffer:
+    """
+    Tampon mémoire des positions reçues : écrit en base par bulk_create quand
+    il atteint `max_size` points ou que le plus ancien a plus de `max_age`
+    secondes. Un thread démon vide aussi le tampon périodiquement, pour que
+    les derniers points d'un livreur inactif finissent en base.
+    """
+
+    def __init__(self, max_size=None, max_age=None):
+        self.max_size = max_size or get_setting('TRACKING_BUFFER_SIZE', 500)
+        self.max_age = max_age or get_setting('TRACKING_FLUSH_SECONDS', 2)
+        self.lock = threading.Lock()
+        self.rows = []
+        self.oldest = None
+        self.worker = None
+
+    def add(self, rows):
+        with self.lock:
+            if not self.rows:
+                self.oldest = time.monotonic()
+            self.rows.extend(rows)
+            due = len(self.rows) >= self.max_size or time.monotonic() - self.oldest >= self.max_age
+        self.start_worker()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.rows, self.oldest = self.rows, [], None
+        if rows:
+            PositionLivreur.objects.bulk_create(rows, batch_size=self.max_size)
+        return len(rows)
+
+    def start_worker(self):
+        if self.worker is not None or not get_setting('TRACKING_BACKGROUND_FLUSH', True):
+            return
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run, name='position-flush', daemon=True)
+                self.worker.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.max_age)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Échec de l'écriture des positions livreurs")
+            finally:
+                connection.close()
+
+
+buffer = PositionBuffer()
+atexit.register(buffer.flush)
+
+
+def positions_cached():
+    """
+    La dernière position n'est gardée en cache que si celui-ci n'est pas la
+    base : avec DatabaseCache, chaque lot coûterait des requêtes SQL (lecture,
+    écriture, comptage d'éviction) hors de la file d'écriture SQLite. Elle est
+    alors lue dans PositionLivreur, au plus TRACKING_FLUSH_SECONDS plus tard.
+    """
+    return not isinstance(caches['default'], DatabaseCache)
+
+
+def record_positions(livreur_id, points):
+    """Met en tampon les points reçus et garde en cache la plus récente position du livreur."""
+    rows = [
+        PositionLivreur(
+            livreur_id=livreur_id,
+            latitude=point['latitude'],
+            longitude=point['longitude'],
+            horodatage=point.get('horodatage') or timezone.now(),
+            precision=point.get('precision'),
+            vitesse=point.get('vitesse'),
+        )
+        for point in points
+    ]
+    if not rows:
+        return 0
+    if positions_cached():
+        cache_latest(livreur_id, max(rows, key=lambda row: row.horodatage))
+    buffer.add(rows)
+    return len(rows)
+
+
+def cache_latest(livreur_id, latest):
+    key = POSITION_CACHE_KEY.format(livreur_id)
+    cached = cache.get(key)
+    if cached is None or cached['horodatage'] <= latest.horodatage:
+        cache.set(key, {
+            'latitude': latest.latitude,
+            'longitude': latest.longitude,
+            'horodatage': latest.horodatage,
+            'vitesse': latest.vitesse,
+        }, get_setting('TRACKING_POSITION_TTL', 15 * 60))
+
+
+def latest_positions(livreur_ids):
+    """
+    Dernières positions connues, par id de livreur : cache d'abord, puis, pour
+    les livreurs absents du cache (entrée expirée ou évincée), dernier point
+    enregistré en base depuis moins de TRACKING_POSITION_TTL.
+    """
+    positions = {}
+    if positions_cached():
+        keys = {POSITION_CACHE_KEY.format(pk): pk for pk in livreur_ids}
+        positions = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+    missing = [pk for pk in livreur_ids if pk not in positions]
+    if missing:
+        positions.update(stored_positions(missing))
+    return positions
+
+
+def stored_positions(livreur_ids):
+    cutoff = timezone.now() - timedelta(seconds=get_setting('TRACKING_POSITION_TTL', 15 * 60))
+    # Dernier point de chaque livreur : une recherche par livreur sur position_livreur_date_idx
+    newest = (
+        PositionLivreur.objects.filter(livreur=OuterRef('pk'), horodatage__gte=cutoff)
+        .order_by('-horodatage').values('pk')[:1]
+    )
+    ids = [
+        pk for pk in Livreur.objects.filter(pk__in=livreur_ids)
+        .annotate(position_id=Subquery(newest)).values_list('position_id', flat=True)
+        if pk is not None
+    ]
+    rows = PositionLivreur.objects.filter(pk__in=ids).values(
+        'livreur_id', 'latitude', 'longitude', 'horodatage', 'vitesse'
+    ) if ids else []
+    positions = {}
+    for row in rows:
+        positions[row.pop('livreur_id')] = row
+    return positions
+
+
+def latest_position(livreur_id):
+    position = cache.get(POSITION_CACHE_KEY.format(livreur_id)) if positions_cached() else None
+    if position is None:
+        position = (
+            PositionLivreur.objects.filter(livreur_id=livreur_id)
+            .order_by('-horodatage').values('latitude', 'longitude', 'horodatage', 'vitesse').first()
+        )
+    return position
+
+
+def prune(days=None):
+    days = days if days is not None else get_setting('TRACKING_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = PositionLivreur.objects.filter(horodatage__lt=cutoff).delete()
+    return deleted
@@ -2,10 +2,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import async_views
 from .views import (
-    RegisterView, UserProfileView, UserViewSet, PendingApprovalsView,
+    RegisterView, UserProfileView, UserViewSet, PendingApprovalsView, BulkApprovalView,
     StationViewSet, LivreurViewSet, ZoneViewSet, BouteilleViewSet,
-    CommandeViewSet, PaiementViewSet, DashboardStatsView, health_check
+    CommandeViewSet, PaiementViewSet, DashboardStatsView, metrics_view, health_check
 )
 
 router = DefaultRouter()
@@ -24,7 +25,15 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/profile/', UserProfileView.as_view(), name='profile'),
     path('admin/pending-approvals/', PendingApprovalsView.as_view(), name='pending-approvals'),
+    path('admin/bulk-approve/', BulkApprovalView.as_view(), name='bulk-approve'),
     path('admin/dashboard/', DashboardStatsView.as_view(), name='dashboard'),
+    path('admin/metrics/', metrics_view, name='metrics'),
+    # Lectures asynchrones (ORM async), à servir par l'application ASGI
+    path('async/bouteilles/', async_views.BouteilleListView.as_view(), name='async-bouteille-list'),
+    path('async/stations/', async_views.StationListView.as_view(), name='async-station-list'),
+    path('async/commandes/', async_views.CommandeListView.as_view(), name='async-commande-list'),
+    path('async/commandes/<int:pk>/', async_views.CommandeDetailView.as_view(), name='async-commande-detail'),
+    path('async/admin/dashboard/', async_views.DashboardView.as_view(), name='async-dashboard'),
     path('health/', health_check, name='health_check'),
     # Ajout de la route health sans slash pour compatibilité
     path('health', health_check, name='health_check_no_slash'),
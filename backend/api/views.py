@@ -1,23 +1,98 @@
 from rest_framework import viewsets, generics, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.db.models import Sum, Count
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse
 from django.utils import timezone
-from datetime import timedelta
 import uuid
 
-from .models import User, Station, Livreur, Zone, Bouteille, Commande, Paiement
+from .authentication import load_user
+from .catalogue import CatalogueCacheMixin
+from .dispatch import ACTIVE_STATUTS, DispatchEngine, annotate_charge
+from .geo import parse_near, filter_near
+from .pagination import CommandePagination, PaiementPagination
+from .realtime import publish_commande_event
+from .stats import dashboard_stats
+from . import tracking
+from . import stock
+from . import approvals
+from . import db_router
+from . import bulk
+from . import livreur_stats
+from . import inbox
+from . import metrics
+from .models import User, Station, Livreur, Zone, Bouteille, Commande, Tournee, Paiement, Evaluation
 from .serializers import (
     UserSerializer, RegisterSerializer, StationSerializer, LivreurSerializer,
     ZoneSerializer, BouteilleSerializer, CommandeSerializer, CommandeCreateSerializer,
-    PaiementSerializer, DashboardStatsSerializer, ApprovalSerializer
+    CommandeBulkCreateSerializer, CommandeBulkStatutSerializer, CommandeInboxFilterSerializer,
+    EvaluationSerializer, PaiementSerializer, DashboardStatsSerializer, ApprovalSerializer,
+    BulkApprovalSerializer, PositionBatchSerializer, TourneeSerializer
 )
 from .permissions import IsAdmin, IsStation, IsApprovedStation, IsLivreur, IsApprovedLivreur, IsClient, IsOwnerOrAdmin
 
 
+class QueryPlanMixin:
+    # Plan de requête par action : select_related / prefetch_related nécessaires
+    # aux serializers imbriqués. La clé 'default' s'applique aux actions absentes.
+    query_plans = {}
+    
+    def get_query_plan(self):
+        return self.query_plans.get(self.action, self.query_plans.get('default', {}))
+    
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        if plan.get('select_related'):
+            queryset = queryset.select_related(*plan['select_related'])
+        if plan.get('prefetch_related'):
+            queryset = queryset.prefetch_related(*plan['prefetch_related'])
+        return queryset
+
+
+class ReplicaReadMixin:
+    # Actions en lecture seule servies par un réplica (api.db_router) ;
+    # l'authentification, faite avant, reste sur la base principale.
+    replica_actions = ('list', 'retrieve')
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self._replica_token = db_router.start_replica_reads()
+    
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Aussi quand une exception non gérée traverse la vue
+            token = getattr(self, '_replica_token', None)
+            if token is not None:
+                db_router.stop_replica_reads(token)
+                self._replica_token = None
+
+
+class NearSearchMixin:
+    # Mode `?near=lat,lng&radius=km` sur la liste : résultats triés par distance.
+    # near_prefix désigne la relation qui porte les coordonnées (ex. 'station__').
+    near_prefix = ''
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        near = self.request.query_params.get('near')
+        if self.action != 'list' or not near:
+            return queryset
+        try:
+            latitude, longitude, radius_km = parse_near(near, self.request.query_params.get('radius'))
+        except ValueError as exc:
+            raise ValidationError({'near': str(exc)})
+        return filter_near(queryset, latitude, longitude, radius_km, prefix=self.near_prefix)
+
+
 class RegisterView(generics.CreateAPIView):
+    sqlite_write_queue = True
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
@@ -38,24 +113,30 @@ class RegisterView(generics.CreateAPIView):
 
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
+    sqlite_write_queue = True
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user peut venir du cache d'authentification : la mise à jour part de la ligne en base
+        return load_user(self.request.user.pk)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ReplicaReadMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
+    query_plans = {
+        'approve': {'select_related': ('station_profile', 'livreur_profile')},
+    }
     
     def get_queryset(self):
         queryset = User.objects.all()
         role = self.request.query_params.get('role')
         if role:
             queryset = queryset.filter(role=role)
-        return queryset
+        return self.apply_query_plan(queryset)
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -64,14 +145,14 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         user.is_approved = serializer.validated_data['approved']
-        user.save()
+        user.save(update_fields=['is_approved'])
         
         if user.role == 'station':
             try:
                 station = user.station_profile
                 station.is_approved = serializer.validated_data['approved']
                 station.is_active = serializer.validated_data['approved']
-                station.save()
+                station.save(update_fields=['is_approved', 'is_active'])
             except Station.DoesNotExist:
                 pass
         
@@ -79,7 +160,7 @@ class UserViewSet(viewsets.ModelViewSet):
             try:
                 livreur = user.livreur_profile
                 livreur.is_approved = serializer.validated_data['approved']
-                livreur.save()
+                livreur.save(update_fields=['is_approved'])
             except Livreur.DoesNotExist:
                 pass
         
@@ -98,9 +179,40 @@ class PendingApprovalsView(generics.ListAPIView):
         )
 
 
-class StationViewSet(viewsets.ModelViewSet):
+class BulkApprovalView(APIView):
+    sqlite_write_queue = True
+    permission_classes = [IsAdmin]
+    
+    def post(self, request):
+        serializer = BulkApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        approved = data['approved']
+        
+        # Cascade User <-> Station/Livreur en UPDATE ensemblistes (api.approvals)
+        counts = {'users': 0, 'stations': 0, 'livreurs': 0}
+        with transaction.atomic():
+            if data.get('users'):
+                users = User.objects.filter(pk__in=data['users'])
+                counts['users'] = approvals.set_users_approval(users, approved)
+            if data.get('stations'):
+                stations = Station.objects.filter(pk__in=data['stations'])
+                counts['stations'] = approvals.set_stations_approval(stations, approved)
+            if data.get('livreurs'):
+                livreurs = Livreur.objects.filter(pk__in=data['livreurs'])
+                counts['livreurs'] = approvals.set_livreurs_approval(livreurs, approved)
+        
+        action_msg = "approuvés" if approved else "refusés"
+        return Response({'message': f'Comptes {action_msg} avec succès.', **counts})
+
+
+class StationViewSet(ReplicaReadMixin, NearSearchMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Station.objects.all()
     serializer_class = StationSerializer
+    query_plans = {
+        'default': {'select_related': ('user',)},
+    }
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -112,10 +224,12 @@ class StationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Station.objects.all()
-        if user.role == 'station':
-            return Station.objects.filter(user=user)
-        return Station.objects.filter(is_approved=True, is_active=True)
+            queryset = Station.objects.all()
+        elif user.role == 'station':
+            queryset = Station.objects.filter(user=user)
+        else:
+            queryset = Station.objects.filter(is_approved=True, is_active=True)
+        return self.apply_query_plan(queryset)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def approve(self, request, pk=None):
@@ -125,33 +239,42 @@ class StationViewSet(viewsets.ModelViewSet):
         
         station.is_approved = serializer.validated_data['approved']
         station.is_active = serializer.validated_data['approved']
-        station.save()
+        station.save(update_fields=['is_approved', 'is_active'])
         
         station.user.is_approved = serializer.validated_data['approved']
-        station.user.save()
+        station.user.save(update_fields=['is_approved'])
         
         action_msg = "approuvée" if serializer.validated_data['approved'] else "refusée"
         return Response({'message': f'Station {action_msg} avec succès.'})
 
 
-class LivreurViewSet(viewsets.ModelViewSet):
+class LivreurViewSet(ReplicaReadMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Livreur.objects.all()
     serializer_class = LivreurSerializer
+    query_plans = {
+        'default': {'select_related': ('user', 'zone')},
+    }
+    compact_actions = ('list', 'disponibles')
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'position', 'tournee']:
             return [permissions.IsAuthenticated()]
         if self.action in ['approve']:
             return [IsAdmin()]
+        if self.action in ['positions']:
+            return [IsApprovedLivreur()]
         return [IsLivreur()]
     
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Livreur.objects.all()
-        if user.role == 'livreur':
-            return Livreur.objects.filter(user=user)
-        return Livreur.objects.filter(is_approved=True)
+            queryset = Livreur.objects.all()
+        elif user.role == 'livreur':
+            queryset = Livreur.objects.filter(user=user)
+        else:
+            queryset = Livreur.objects.filter(is_approved=True)
+        return self.apply_query_plan(queryset)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def approve(self, request, pk=None):
@@ -160,22 +283,66 @@ class LivreurViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         livreur.is_approved = serializer.validated_data['approved']
-        livreur.save()
+        livreur.save(update_fields=['is_approved'])
         
         livreur.user.is_approved = serializer.validated_data['approved']
-        livreur.user.save()
+        livreur.user.save(update_fields=['is_approved'])
         
         action_msg = "approuvé" if serializer.validated_data['approved'] else "refusé"
         return Response({'message': f'Livreur {action_msg} avec succès.'})
     
     @action(detail=False, methods=['get'])
     def disponibles(self, request):
-        livreurs = Livreur.objects.filter(is_approved=True, is_disponible=True)
+        livreurs = annotate_charge(
+            self.apply_query_plan(Livreur.objects.filter(is_approved=True, is_disponible=True))
+        ).order_by('charge', '-note_moyenne', 'id')
         serializer = self.get_serializer(livreurs, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], sqlite_write_queue=False)
+    def positions(self, request):
+        # Lot de points GPS envoyé par l'application livreur ; écrit en base par api.tracking
+        serializer = PositionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        count = tracking.record_positions(request.user.livreur_profile.pk, serializer.validated_data['points'])
+        return Response({'recues': count}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def tournee(self, request, pk=None):
+        # Tournée en cours du livreur, arrêts dans l'ordre de passage (api.routing)
+        livreur = self.get_object()
+        if request.user.role != 'admin' and livreur.user_id != request.user.pk:
+            return Response({'error': 'Accès refusé.'}, status=status.HTTP_403_FORBIDDEN)
+        tournee = (
+            Tournee.objects.filter(livreur=livreur, commandes__statut__in=ACTIVE_STATUTS)
+            .select_related('station')
+            .prefetch_related(Prefetch(
+                'commandes', queryset=Commande.objects.select_related('client').order_by('ordre_tournee')
+            ))
+            .order_by('-date_creation')
+            .first()
+        )
+        if tournee is None:
+            return Response({'error': 'Aucune tournée en cours.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TourneeSerializer(tournee, context=self.get_serializer_context()).data)
+    
+    @action(detail=True, methods=['get'])
+    def position(self, request, pk=None):
+        # Le livreur lui-même, l'admin ou un client dont une commande en cours lui est confiée
+        livreur = self.get_object()
+        user = request.user
+        if user.role != 'admin' and livreur.user_id != user.pk and not Commande.objects.filter(
+            client=user, livreur=livreur, statut__in=ACTIVE_STATUTS
+        ).exists():
+            return Response({'error': 'Accès refusé.'}, status=status.HTTP_403_FORBIDDEN)
+        position = tracking.latest_position(livreur.pk)
+        if position is None:
+            return Response({'error': 'Position inconnue.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(position)
 
 
-class ZoneViewSet(viewsets.ModelViewSet):
+class ZoneViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Zone.objects.all()
     serializer_class = ZoneSerializer
     
@@ -185,9 +352,15 @@ class ZoneViewSet(viewsets.ModelViewSet):
         return [IsAdmin()]
 
 
-class BouteilleViewSet(viewsets.ModelViewSet):
+class BouteilleViewSet(CatalogueCacheMixin, ReplicaReadMixin, NearSearchMixin, QueryPlanMixin,
+                       viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Bouteille.objects.all()
     serializer_class = BouteilleSerializer
+    query_plans = {
+        'default': {'select_related': ('station',)},
+    }
+    near_prefix = 'station__'
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -212,49 +385,132 @@ class BouteilleViewSet(viewsets.ModelViewSet):
         if marque:
             queryset = queryset.filter(marque__icontains=marque)
         
-        return queryset
+        return self.apply_query_plan(queryset)
     
     def perform_create(self, serializer):
         serializer.save(station=self.request.user.station_profile)
 
 
-class CommandeViewSet(viewsets.ModelViewSet):
+class CommandeViewSet(ReplicaReadMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Commande.objects.all()
     serializer_class = CommandeSerializer
+    pagination_class = CommandePagination
+    query_plans = {
+        'default': {
+            'select_related': (
+                'client', 'bouteille__station', 'station__user',
+                'livreur__user', 'livreur__zone',
+            ),
+        },
+        'create': {},
+        'assign_livreur': {'select_related': ('bouteille', 'station')},
+        'update_status': {'select_related': ('bouteille',)},
+        'bulk_update_status': {},
+        'evaluer': {},
+    }
+    compact_actions = ('list', 'inbox')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return CommandeCreateSerializer
+        if self.action == 'bulk':
+            return CommandeBulkCreateSerializer
+        if self.action == 'bulk_update_status':
+            return CommandeBulkStatutSerializer
         return CommandeSerializer
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Commande.objects.none()
         if user.role == 'admin':
-            return Commande.objects.all()
-        if user.role == 'client':
-            return Commande.objects.filter(client=user)
-        if user.role == 'station':
+            queryset = Commande.objects.all()
+        elif user.role == 'client':
+            queryset = Commande.objects.filter(client=user)
+        elif user.role == 'station':
             try:
-                return Commande.objects.filter(station=user.station_profile)
+                queryset = Commande.objects.filter(station=user.station_profile)
             except:
-                return Commande.objects.none()
-        if user.role == 'livreur':
+                pass
+        elif user.role == 'livreur':
             try:
-                return Commande.objects.filter(livreur=user.livreur_profile)
+                queryset = Commande.objects.filter(livreur=user.livreur_profile)
             except:
-                return Commande.objects.none()
-        return Commande.objects.none()
+                pass
+        return self.apply_query_plan(queryset)
+    
+    def perform_create(self, serializer):
+        commande = serializer.save()
+        publish_commande_event(commande, 'commande.creee')
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsApprovedStation])
+    def inbox(self, request):
+        """
+        Boîte de réception de la station : filtres `statut` (liste), `date_debut`,
+        `date_fin`, `livreur`, compteurs par statut, et `?since=` avec la valeur
+        `synchronise_a` de la réponse précédente pour ne recevoir que les
+        commandes modifiées depuis. Lu sur la base principale (pas de retard de réplica).
+        """
+        params = CommandeInboxFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        
+        synchronise_a = timezone.now()
+        queryset = inbox.restrict(self.get_queryset(), filters)
+        compteurs = inbox.status_counts(queryset)
+        page = self.paginate_queryset(inbox.select(queryset, filters))
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['compteurs'] = compteurs
+        response.data['synchronise_a'] = synchronise_a.isoformat()
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        commandes = serializer.save()
+        return Response(
+            {'commandes': CommandeSerializer(commandes, many=True, context=self.get_serializer_context()).data},
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['commandes']
+        
+        commandes = self.get_queryset().in_bulk([item['id'] for item in items])
+        errors = bulk.item_errors(items, lambda item: item['id'] not in commandes, 'id', 'Commande introuvable.')
+        if any(errors['commandes']):
+            raise ValidationError(errors)
+        
+        bulk.update_statuts(list(commandes.values()), items)
+        return Response({'message': 'Statuts mis à jour avec succès.', 'mises_a_jour': len(commandes)})
     
     @action(detail=True, methods=['post'])
     def assign_livreur(self, request, pk=None):
         commande = self.get_object()
         livreur_id = request.data.get('livreur_id')
         
+        # Sans livreur_id, le moteur de dispatch choisit le meilleur livreur
+        if not livreur_id:
+            if commande.statut != 'en_attente' or commande.livreur_id:
+                return Response({'error': 'Commande déjà assignée.'}, status=status.HTTP_409_CONFLICT)
+            assigned = DispatchEngine().dispatch([commande])
+            if not assigned:
+                return Response({'error': 'Aucun livreur disponible.'}, status=status.HTTP_409_CONFLICT)
+            return Response({
+                'message': 'Livreur assigné avec succès.',
+                'livreur_id': assigned[0].livreur_id,
+            })
+        
         try:
             livreur = Livreur.objects.get(id=livreur_id, is_approved=True)
             commande.livreur = livreur
             commande.statut = 'assignee'
-            commande.save()
+            commande.save(update_fields=['livreur', 'statut'])
+            publish_commande_event(commande, 'commande.assignee')
             return Response({'message': 'Livreur assigné avec succès.'})
         except Livreur.DoesNotExist:
             return Response({'error': 'Livreur non trouvé.'}, status=status.HTTP_404_NOT_FOUND)
@@ -267,26 +523,81 @@ class CommandeViewSet(viewsets.ModelViewSet):
         if new_status not in dict(Commande.STATUT_CHOICES):
             return Response({'error': 'Statut invalide.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        commande.statut = new_status
-        if new_status == 'livree':
-            commande.date_livraison = timezone.now()
-            if commande.livreur:
-                commande.livreur.nombre_livraisons += 1
-                commande.livreur.save()
-        
-        commande.save()
+        with transaction.atomic():
+            if new_status == 'annulee' and commande.statut != 'annulee':
+                # La transition conditionnelle évite de libérer deux fois le stock
+                annulee = Commande.objects.filter(pk=commande.pk).exclude(statut='annulee').update(
+                    statut='annulee', date_modification=timezone.now()
+                )
+                if not annulee:
+                    # Annulation déjà faite par une requête concurrente
+                    return Response({'message': 'Statut mis à jour avec succès.'})
+                stock.release(commande.bouteille_id, commande.quantite)
+            elif commande.statut == 'annulee' and new_status != 'annulee':
+                # Réouverture conditionnelle : le stock n'est réservé qu'une fois
+                reouverte = Commande.objects.filter(pk=commande.pk, statut='annulee').update(
+                    statut=new_status, date_modification=timezone.now()
+                )
+                if not reouverte:
+                    return Response({'message': 'Statut mis à jour avec succès.'})
+                if not stock.reserve(commande.bouteille_id, commande.quantite):
+                    transaction.set_rollback(True)
+                    return Response({'error': 'Stock insuffisant.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if new_status == 'livree' and commande.statut != 'livree':
+                commande.date_livraison = timezone.now()
+                # Transition conditionnelle : deux « livree » concurrents ne comptent qu'une livraison
+                livree = Commande.objects.filter(pk=commande.pk).exclude(statut='livree').update(
+                    statut='livree', date_livraison=commande.date_livraison,
+                    date_modification=commande.date_livraison,
+                )
+                # Après une réouverture vers « livree », la transition est déjà acquise
+                if not livree and commande.statut != 'annulee':
+                    return Response({'message': 'Statut mis à jour avec succès.'})
+                if commande.livreur_id:
+                    # Incrément atomique en base plutôt que lecture-modification-écriture du livreur
+                    livreur_stats.record_deliveries({commande.livreur_id: 1})
+            commande.statut = new_status
+            
+            commande.save(update_fields=['statut', 'date_livraison'])
+            publish_commande_event(commande, 'commande.statut')
         return Response({'message': 'Statut mis à jour avec succès.'})
+    
+    @action(detail=True, methods=['post'])
+    def evaluer(self, request, pk=None):
+        commande = self.get_object()
+        if commande.client_id != request.user.pk:
+            return Response({'error': 'Seul le client peut évaluer sa commande.'}, status=status.HTTP_403_FORBIDDEN)
+        if commande.statut != 'livree' or not commande.livreur_id:
+            return Response({'error': 'Seule une commande livrée peut être évaluée.'}, status=status.HTTP_400_BAD_REQUEST)
+        if Evaluation.objects.filter(commande=commande).exists():
+            return Response({'error': 'Commande déjà évaluée.'}, status=status.HTTP_409_CONFLICT)
+        
+        serializer = EvaluationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            evaluation = livreur_stats.rate(
+                commande, serializer.validated_data['note'], serializer.validated_data.get('commentaire')
+            )
+        except IntegrityError:
+            # Évaluation concurrente de la même commande
+            return Response({'error': 'Commande déjà évaluée.'}, status=status.HTTP_409_CONFLICT)
+        return Response(EvaluationSerializer(evaluation).data, status=status.HTTP_201_CREATED)
 
 
-class PaiementViewSet(viewsets.ModelViewSet):
+class PaiementViewSet(ReplicaReadMixin, QueryPlanMixin, viewsets.ModelViewSet):
+    sqlite_write_queue = True
     queryset = Paiement.objects.all()
     serializer_class = PaiementSerializer
+    pagination_class = PaiementPagination
     
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Paiement.objects.all()
-        return Paiement.objects.filter(commande__client=user)
+            queryset = Paiement.objects.all()
+        else:
+            queryset = Paiement.objects.filter(commande__client=user)
+        return self.apply_query_plan(queryset)
     
     def perform_create(self, serializer):
         reference = f"PAY-{uuid.uuid4().hex[:8].upper()}"
@@ -297,28 +608,30 @@ class DashboardStatsView(APIView):
     permission_classes = [IsAdmin]
     
     def get(self, request):
-        now = timezone.now()
-        today = now.date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        stats = {
-            'total_clients': User.objects.filter(role='client').count(),
-            'total_livreurs': Livreur.objects.filter(is_approved=True).count(),
-            'total_stations': Station.objects.filter(is_approved=True).count(),
-            'total_commandes': Commande.objects.count(),
-            'revenus_totaux': Commande.objects.filter(statut='livree').aggregate(
-                total=Sum('montant_total'))['total'] or 0,
-            'commandes_jour': Commande.objects.filter(date_commande__date=today).count(),
-            'commandes_semaine': Commande.objects.filter(date_commande__date__gte=week_ago).count(),
-            'commandes_mois': Commande.objects.filter(date_commande__date__gte=month_ago).count(),
-        }
+        # Lecture des rollups journaliers (api.stats) au lieu de compter les commandes
+        stats = dashboard_stats()
         
         serializer = DashboardStatsSerializer(stats)
         return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def metrics_view(request):
+    # Format texte Prometheus (api.metrics)
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def health_check(request):
+    # Vérifie aussi que la base principale répond (sonde des load balancers)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return Response(
+            {'status': 'error', 'message': 'Database unavailable'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     return Response({'status': 'ok', 'message': 'GazExpress API is running'})
@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import bounding_box, cell_index, haversine_km
+from .models import Zone
+
+
+ZONES_VERSION_KEY = 'zones:version'
+
+
+class ZoneShape:
+    def __init__(self, zone):
+        self.zone = zone
+        self.polygon = None
+        self.centre = None
+        self.radius_km = None
+        if zone.polygone:
+            self.polygon = [(float(lat), float(lng)) for lat, lng in zone.polygone]
+            lats = [lat for lat, _ in self.polygon]
+            lngs = [lng for _, lng in self.polygon]
+            self.bbox = (min(lats), max(lats), min(lngs), max(lngs))
+        else:
+            self.centre = (float(zone.centre_latitude), float(zone.centre_longitude))
+            self.radius_km = float(zone.rayon_km)
+            self.bbox = bounding_box(*self.centre, self.radius_km)
+        # Sert à départager des zones qui se chevauchent : la plus petite l'emporte
+        self.area = (self.bbox[1] - self.bbox[0]) * (self.bbox[3] - self.bbox[2])
+
+    @classmethod
+    def has_geometry(cls, zone):
+        return bool(zone.polygone) or None not in (zone.centre_latitude, zone.centre_longitude, zone.rayon_km)
+
+    def contains(self, latitude, longitude):
+        min_lat, max_lat, min_lng, max_lng = self.bbox
+        if not (min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng):
+            return False
+        if self.polygon is None:
+            return haversine_km(*self.centre, latitude, longitude) <= self.radius_km
+        return point_in_polygon(latitude, longitude, self.polygon)
+
+
+def point_in_polygon(latitude, longitude, polygon):
+    # Lancer de rayon (nombre de croisements pair/impair)
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lng_i > longitude) != (lng_j > longitude):
+            crossing = lat_i + (longitude - lng_i) * (lat_j - lat_i) / (lng_j - lng_i)
+            if latitude < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+class ZoneIndex:
+    """
+    Index mémoire des zones actives : chaque zone est rangée dans les cellules
+    de grille (api.geo) que couvre son emprise, la résolution d'un point ne
+    teste donc que les quelques zones de sa cellule, sans requête SQL.
+    """
+
+    def __init__(self, zones):
+        self.grid = {}
+        self.default = None
+        for zone in zones:
+            if not ZoneShape.has_geometry(zone):
+                if self.default is None:
+                    self.default = zone
+                continue
+            shape = ZoneShape(zone)
+            min_lat, max_lat, min_lng, max_lng = shape.bbox
+            lat_start, lng_start = cell_index(min_lat, min_lng)
+            lat_end, lng_end = cell_index(max_lat, max_lng)
+            for i in range(lat_start, lat_end + 1):
+                for j in range(lng_start, lng_end + 1):
+                    self.grid.setdefault((i, j), []).append(shape)
+        for shapes in self.grid.values():
+            shapes.sort(key=lambda shape: shape.area)
+
+    def resolve(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            return self.default
+        latitude, longitude = float(latitude), float(longitude)
+        for shape in self.grid.get(cell_index(latitude, longitude), ()):
+            if shape.contains(latitude, longitude):
+                return shape.zone
+        return self.default
+
+
+_index = None
+_index_version = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def new_version():
+    # Jeton unique plutôt qu'un compteur : une clé évincée puis recréée ne
+    # peut pas reprendre une valeur déjà vue par un processus
+    return time.time_ns()
+
+
+def current_version():
+    """Version partagée (cache commun à tous les processus, cf. api.checks)."""
+    version = cache.get(ZONES_VERSION_KEY)
+    if version is None:
+        # Premier accès ou clé évincée : nouvelle version, chaque processus recharge son index
+        cache.add(ZONES_VERSION_KEY, new_version(), None)
+        version = cache.get(ZONES_VERSION_KEY) or new_version()
+    return version
+
+
+def get_index():
+    """
+    Index chargé une fois par processus et rechargé quand la version partagée
+    change. La version n'est relue qu'une fois par ZONES_VERSION_CHECK_SECONDS :
+    entre deux lectures, resolve() ne touche pas au cache partagé.
+    """
+    global _index, _index_version, _checked_at
+    interval = getattr(settings, 'ZONES_VERSION_CHECK_SECONDS', 5)
+    if _index is not None and _checked_at is not None and time.monotonic() - _checked_at < interval:
+        return _index
+    version = current_version()
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = ZoneIndex(Zone.objects.filter(is_active=True).order_by('id'))
+                _index_version = version
+    _checked_at = time.monotonic()
+    return _index
+
+
+def invalidate():
+    # Le processus qui modifie une zone recharge aussitôt ; les autres à leur prochaine vérification
+    global _index, _checked_at
+    _index = None
+    _checked_at = None
+    cache.set(ZONES_VERSION_KEY, new_version(), None)
+
+
+def resolve(latitude, longitude):
+    return get_index().resolve(latitude, longitude)
@@ -0,0 +1,114 @@
+"""
+Configuration des bases de données depuis l'environnement.
+
+- DATABASE_URL : postgres://user:pass@hôte:5432/nom?sslmode=require ou
+  sqlite:///chemin/vers/db.sqlite3 (SQLite local par défaut) ;
+- DATABASE_REPLICA_URLS : URLs des réplicas en lecture, séparées par des virgules ;
+- DB_CONN_MAX_AGE : durée de vie (s) des connexions persistantes PostgreSQL ;
+- DB_POOL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT : pool de
+  connexions natif de Django (psycopg 3), à la place des connexions persistantes ;
+- SQLITE_BUSY_TIMEOUT : attente (s) d'un verrou d'écriture SQLite avant erreur ;
+- SQLITE_MMAP_SIZE : taille (octets) de la projection mémoire du fichier SQLite.
+"""
+import os
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+
+POSTGRES_SCHEMES = ('postgres', 'postgresql', 'pgsql')
+
+
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_busy_timeout():
+    return int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20))
+
+
+def sqlite_pragmas():
+    return [
+        # WAL : les lectures ne bloquent plus l'écrivain, ni l'écrivain les lectures
+        ('journal_mode', 'WAL'),
+        # En WAL, NORMAL reste cohérent après un crash et évite un fsync par commit
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        ('busy_timeout', sqlite_busy_timeout() * 1000),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def configure_sqlite(connection):
+    """Appliqué à chaque nouvelle connexion SQLite (signal connection_created, api.signals)."""
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas():
+            cursor.execute(f'PRAGMA {name}={value}')
+
+
+def sqlite_config(name, test_name=None):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            # Attente du verrou au lieu d'un « database is locked » immédiat
+            'timeout': sqlite_busy_timeout(),
+            # Verrou d'écriture pris dès BEGIN : pas d'échec lors du passage lecture -> écriture
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+    if test_name:
+        config['TEST'] = {'NAME': test_name}
+    return config
+
+
+def postgres_config(parts):
+    options = dict(parse_qsl(parts.query))
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Vérifie une connexion réutilisée avant la requête (redémarrage serveur, failover)
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+    }
+    if env_bool('DB_POOL'):
+        # Le pool remplace les connexions persistantes (incompatibles avec CONN_MAX_AGE)
+        config['CONN_MAX_AGE'] = 0
+        options['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    return config
+
+
+def parse_database_url(url, test_name=None):
+    parts = urlsplit(url)
+    if parts.scheme in POSTGRES_SCHEMES:
+        return postgres_config(parts)
+    if parts.scheme == 'sqlite':
+        # sqlite:///relatif.sqlite3 ou sqlite:////chemin/absolu.sqlite3
+        return sqlite_config(parts.path[1:] or ':memory:', test_name)
+    raise ValueError(f'DATABASE_URL non prise en charge : {parts.scheme}://')
+
+
+def database_settings(base_dir):
+    default_url = os.environ.get('DATABASE_URL')
+    if default_url:
+        default = parse_database_url(default_url, test_name=base_dir / 'test_db.sqlite3')
+    else:
+        # Base de test sur fichier : la base mémoire partagée ne permet pas
+        # d'exercer de vraies écritures concurrentes (tests de réservation de stock)
+        default = sqlite_config(base_dir / 'db.sqlite3', test_name=base_dir / 'test_db.sqlite3')
+    databases = {'default': default}
+
+    replica_urls = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    for i, url in enumerate(replica_urls, start=1):
+        replica = parse_database_url(url)
+        # En test, les réplicas pointent sur la base par défaut
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f'replica{i}'] = replica
+    return databases
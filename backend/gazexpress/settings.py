@@ -3,6 +3,8 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 
+from .database import database_settings
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En tête : mesure la requête complète (api.metrics)
+    'api.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -35,6 +39,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # File d'attente des écritures, active seulement sur SQLite
+    'api.middleware.SQLiteWriteQueueMiddleware',
 ]
 
 ROOT_URLCONF = 'gazexpress.urls'
@@ -57,12 +63,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'gazexpress.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# DATABASE_URL (PostgreSQL, pool, réplicas) ou SQLite local : voir gazexpress/database.py
+DATABASES = database_settings(BASE_DIR)
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -91,12 +94,12 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
@@ -107,3 +110,73 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Dispatch automatique des livreurs (python manage.py dispatch_livreurs)
+DISPATCH_INTERVAL_SECONDS = int(os.environ.get('DISPATCH_INTERVAL_SECONDS', 5))
+DISPATCH_BATCH_SIZE = 500
+DISPATCH_MAX_ACTIVE_LIVRAISONS = 3
+DISPATCH_MAX_PICKUP_KM = 15
+# Tournées multi-arrêts (dispatch_livreurs --tournees) : distance max (km) entre
+# deux arrêts consécutifs, nombre minimal d'arrêts pour former une tournée
+ROUTING_MAX_LEG_KM = 3
+ROUTING_MIN_STOPS = 2
+
+# Diffusion temps réel des événements de commande (websocket /ws/events/ sous ASGI).
+# InProcessBroker ne diffuse qu'à l'intérieur d'un processus : les événements
+# publiés par un autre worker (gunicorn -w N, WSGI à côté de l'ASGI, commandes
+# de gestion) n'atteignent pas ses websockets. Il n'est donc valable qu'avec un
+# unique processus ASGI ; au-delà, fournir un broker partagé implémentant
+# api.realtime.Broker (publish / subscribe / unsubscribe).
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'api.realtime.InProcessBroker')
+
+# Suivi GPS des livreurs (api.tracking) ; purge : python manage.py prune_positions
+TRACKING_BUFFER_SIZE = 500
+TRACKING_FLUSH_SECONDS = 2
+TRACKING_POSITION_TTL = 15 * 60
+TRACKING_RETENTION_DAYS = int(os.environ.get('TRACKING_RETENTION_DAYS', 7))
+
+# Cache partagé par tous les workers et les commandes de gestion : positions
+# temps réel (api.tracking), catalogue, zones et utilisateurs authentifiés en
+# dépendent. Redis si REDIS_URL est défini, sinon une table de la base
+# principale, créée par la migration api 0013 : sans installation, mais chaque
+# accès au cache y est une requête SQL (Redis conseillé en production ; les
+# positions GPS ne passent alors pas par le cache). Un cache propre à chaque
+# processus (LocMemCache) est refusé par le contrôle api.E001 (api.checks).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'gazexpress_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        },
+    }
+
+# Cache des réponses du catalogue public (api.catalogue) ; invalidé à chaque
+# modification de bouteille/station, le TTL borne seulement le retard du stock affiché.
+CATALOGUE_CACHE_TTL = 60
+
+# Déclinaisons des images du catalogue (api.images) : nom -> plus grand côté (px),
+# générées après l'envoi par IMAGE_VARIANT_WORKERS threads ; rattrapage des
+# images existantes : python manage.py generate_image_variants
+IMAGE_VARIANTS = {'miniature': 320, 'detail': 1080}
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+
+# Durée (s) de mise en cache de l'utilisateur authentifié par jeton (api.authentication)
+AUTH_USER_CACHE_TTL = 30
+
+# Intervalle (s) entre deux lectures de la version partagée des zones (api.zones) :
+# borne le retard d'un autre processus après une modification de zone
+ZONES_VERSION_CHECK_SECONDS = 5
+
+# Écrivain unique sur SQLite (api.middleware.SQLiteWriteQueueMiddleware) :
+# les écritures concurrentes attendent au plus ce délai (s) avant une 503.
+SQLITE_WRITE_QUEUE = os.environ.get('SQLITE_WRITE_QUEUE', 'True').lower() == 'true'
+SQLITE_WRITE_QUEUE_TIMEOUT = int(os.environ.get('SQLITE_WRITE_QUEUE_TIMEOUT', 30))
+
+# Métriques par vue (api.middleware.MetricsMiddleware, GET /api/admin/metrics/) ;
+# requêtes plus longues que METRICS_SLOW_REQUEST_MS journalisées avec leur SQL
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', 500))